@@ -0,0 +1,46 @@
+"""Benchmark of the ARMA linear filter engine against the step by step loop.
+
+Run with `python -m benchmarks.bench_arma` from the root of the repository. Print the time taken by both
+implementations for several sizes and model orders, and the time per path
+when several paths are generated in one call.
+"""
+import timeit
+import numpy
+from khronos.series.filters import arma_filter
+
+def loop_filter(noise, p, q, start):
+    """The original step by step implementation of ARMA_generator"""
+    p_order, q_order = len(p), len(q)
+    p, q = numpy.array(p)[::-1], numpy.array(q)[::-1]
+    values = numpy.array(noise)
+    for time in range(start, len(noise)):
+        values[time] += numpy.dot(p, values[time-p_order:time]) + numpy.dot(q, noise[time-q_order:time])
+    return values
+
+def bench(size, order, loop_max_size=10**5):
+    p, q = [0.5/order]*order, [0.3/order]*order
+    noise = numpy.random.normal(size=size+order)
+    n_run = 3
+    t_filter = timeit.timeit(lambda: arma_filter(noise, p, q, start=order+1), number=n_run)/n_run
+    if size <= loop_max_size:
+        t_loop = timeit.timeit(lambda: loop_filter(noise, p, q, start=order+1), number=1)
+    else:
+        t_loop = float('nan')
+    return t_filter, t_loop
+
+def bench_paths(size, n_paths, order=2):
+    """Time per path when generating `n_paths` paths in one call"""
+    p, q = [0.5/order]*order, [0.3/order]*order
+    noise = numpy.random.normal(size=(n_paths, size+order))
+    t = timeit.timeit(lambda: arma_filter(noise, p, q, start=order+1), number=3)/3
+    return t/n_paths
+
+if __name__ == '__main__':
+    print("{:>10} {:>6} {:>12} {:>12}".format('size', 'order', 'filter (s)', 'loop (s)'))
+    for order in (1, 5, 20):
+        for size in (10**3, 10**4, 10**5, 10**6, 10**7):
+            t_filter, t_loop = bench(size, order)
+            print("{:>10} {:>6} {:>12.4f} {:>12.4f}".format(size, order, t_filter, t_loop))
+    print("{:>10} {:>8} {:>16}".format('size', 'n_paths', 'per path (ms)'))
+    for n_paths in (1, 10, 100, 1000):
+        print("{:>10} {:>8} {:>16.4f}".format(1000, n_paths, 1000*bench_paths(1000, n_paths)))
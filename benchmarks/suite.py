@@ -0,0 +1,149 @@
+"""Benchmark suite of Khronos: wall time and peak memory of the main operations.
+
+Run with `python -m benchmarks.suite` from the root of the repository, for example:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline results.json --tolerance 1.5
+The import time of the package is also measured (in a fresh interpreter).
+The results are written as JSON. When a baseline (a previous JSON output) is given,
+every case slower (or using more memory) than the baseline by more than `tolerance`
+times is reported, and the exit code is 1.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy
+from khronos.series import series_1d, generator
+from khronos.utils.time_utils import generate_timeline
+
+def case_arma(size):
+    return lambda: generator.ARMA_generator(size, p=[0.5,-0.2], q=[0.4])
+
+def case_sarima(size):
+    # Hourly serie with a yearly season
+    return lambda: generator.SARIMA_generator(size, p=[0.5], q=[0.4], P=[0.3], Q=[0.2], season=8760)
+
+def case_gaussian_noise(size):
+    return lambda: generator.gaussian_noise(size)
+
+def case_laplacian_noise(size):
+    return lambda: generator.laplacian_noise(size)
+
+def case_series_sorted(size):
+    values, timeline = numpy.random.normal(size=size), numpy.arange(size)
+    return lambda: series_1d(values, timeline)
+
+def case_series_unsorted(size):
+    values, timeline = numpy.random.normal(size=size), numpy.random.permutation(size)
+    return lambda: series_1d(values, timeline)
+
+def case_split(size):
+    serie = series_1d(numpy.random.normal(size=size), timeline=numpy.arange(size))
+    def run():
+        serie._splitted = False
+        serie.train_test_split(train=0.6, val=0.2)
+        return serie.get_train(), serie.get_val(), serie.get_test()
+    return run
+
+def case_timeline(size):
+    return lambda: generate_timeline(size, start_date="01/01/2000", by="1d")
+
+IMPORT_STATEMENT = "import khronos.series, khronos.stats, khronos.models"
+
+def measure_import(repeat):
+    """Best wall time of a fresh interpreter importing Khronos, minus the time of an empty
+    interpreter, and the number of modules loaded by the import"""
+    def best(statement):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = subprocess.check_output([sys.executable, '-c', statement])
+            times.append(time.perf_counter() - start)
+        return min(times), output
+    empty, _ = best("pass")
+    khronos, output = best(IMPORT_STATEMENT + "; import sys; print(len(sys.modules))")
+    return max(khronos - empty, 0.0), int(output)
+
+CASES = {'ARMA_generator': case_arma,
+         'SARIMA_generator': case_sarima,
+         'gaussian_noise': case_gaussian_noise,
+         'laplacian_noise': case_laplacian_noise,
+         'series_1d_sorted': case_series_sorted,
+         'series_1d_unsorted': case_series_unsorted,
+         'train_test_split': case_split,
+         'generate_timeline': case_timeline}
+
+def measure(run, repeat):
+    """Best wall time over `repeat` runs, and peak memory allocated during one run (bytes)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+def run_suite(cases, sizes, repeat, seed=0):
+    """Run the benchmarks, return a list of results (dictionaries)"""
+    numpy.random.seed(seed)
+    results = []
+    if 'import' in cases:
+        wall_time, n_modules = measure_import(repeat)
+        results.append({'case': 'import', 'size': 0, 'time': wall_time, 'peak_memory': 0, 'modules': n_modules})
+        print("{:<20} {:>10} {:>12.5f} s {:>9} modules".format('import', 0, wall_time, n_modules))
+    for name in cases:
+        if name == 'import':
+            continue
+        for size in sizes:
+            wall_time, peak = measure(CASES[name](size), repeat)
+            results.append({'case': name, 'size': size, 'time': wall_time, 'peak_memory': peak})
+            print("{:<20} {:>10} {:>12.5f} s {:>12.1f} MB".format(name, size, wall_time, peak / 2.**20))
+    return results
+
+def compare(results, baseline, tolerance):
+    """Return the results slower or using more memory than `tolerance` times the baseline"""
+    reference = {(r['case'], r['size']): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        ref = reference.get((r['case'], r['size']))
+        if ref is None:
+            continue
+        for key in ('time', 'peak_memory'):
+            # Small absolute values are too noisy to be compared
+            floor = 1e-3 if key == 'time' else 2**16
+            if r[key] > tolerance * max(ref[key], floor):
+                regressions.append(dict(r, metric=key, baseline=ref[key], ratio=r[key] / max(ref[key], floor)))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Khronos benchmark suite")
+    parser.add_argument('--cases', nargs='+', default=['import'] + list(CASES), choices=['import'] + list(CASES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10**3, 10**4, 10**5, 10**6, 10**7])
+    parser.add_argument('--repeat', type=int, default=3, help="Number of timed runs (the best is kept)")
+    parser.add_argument('--output', help="JSON file to write the results to")
+    parser.add_argument('--baseline', help="JSON file of previous results to compare to")
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help="Ratio to the baseline above which a result is a regression")
+    args = parser.parse_args(argv)
+    
+    results = run_suite(args.cases, args.sizes, args.repeat)
+    output = {'python': platform.python_version(), 'numpy': numpy.__version__, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r in regressions:
+            print("REGRESSION {case} (size {size}): {metric} is {ratio:.2f} times the baseline".format(**r))
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
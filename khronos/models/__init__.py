@@ -0,0 +1 @@
+from .arma import ARMA_model, fit_many
@@ -0,0 +1,164 @@
+"""Estimation of ARMA(p,q) models.
+
+The models use the same conventions as `series.generator.ARMA_generator`:
+    x[t] = e[t] + sum_i p[i]*x[t-1-i] + sum_j q[j]*e[t-1-j]
+A 2D array is fitted as a batch of equal-length series (one per row) in one
+vectorized call. Collections of series of different lengths can be fitted
+on several cores with `fit_many`.
+"""
+from __future__ import absolute_import
+
+import numpy
+from ..series.filters import arma_filter
+from ..stats.correlation import acovf, levinson_durbin
+from ..stats.rolling import _as_values
+
+class ARMA_model:
+    """ARMA(p,q) model.
+    
+    # Arguments:
+        p_order: int, the order of the AR part of the model
+        q_order: int, the order of the MA part of the model
+        method: string, 'yule_walker' (pure AR models only) or 'css' (conditional
+            least squares: Hannan-Rissanen regressions, then regressions on the
+            conditional residuals, repeated `n_iter` times)
+        demean: boolean, if True the mean of the serie is estimated and substracted
+        n_iter: int, the number of refinements for the 'css' method
+    
+    After `fit`, the attributes `p`, `q` (coefficients, of shape (p_order,) and (q_order,),
+    or (n_series, p_order) and (n_series, q_order) for a batch), `sigma2` (variance of the
+    white noise) and `mean` are available.
+    """
+    def __init__(self, p_order, q_order=0, method='css', demean=True, n_iter=5):
+        if method not in ('yule_walker', 'css'):
+            raise ValueError("'method' should be 'yule_walker' or 'css', got {}".format(method))
+        if method == 'yule_walker' and q_order > 0:
+            raise ValueError("The Yule-Walker method can only fit pure AR models (q_order=0)")
+        if p_order < 0 or q_order < 0 or p_order + q_order == 0:
+            raise ValueError("The orders should be positive, and not both zero")
+        self.p_order, self.q_order = p_order, q_order
+        self.method = method
+        self.demean = demean
+        self.n_iter = n_iter
+    
+    def fit(self, x):
+        """Fit the model to a serie (series_1d object or 1D array), or to a batch of
+        equal-length series (2D array, one serie per row). Return the model itself."""
+        x = _as_values(x).astype(float)
+        if x.shape[-1] <= 2*(self.p_order + self.q_order) + 1:
+            raise ValueError("The serie is too short to fit an ARMA({},{})".format(self.p_order, self.q_order))
+        self.mean = x.mean(axis=-1) if self.demean else numpy.zeros(x.shape[:-1])
+        x = x - numpy.asarray(self.mean)[..., None]
+        
+        if self.method == 'yule_walker':
+            self.p, _, self.sigma2 = levinson_durbin(acovf(x, self.p_order, demean=False), self.p_order)
+            self.q = numpy.zeros(x.shape[:-1] + (0,))
+            return self
+        
+        if self.q_order == 0:
+            self.p, self.q = _regress(x, x, self.p_order, None, 0, self.p_order), numpy.zeros(x.shape[:-1] + (0,))
+        else:
+            # Hannan-Rissanen: the noise is first estimated by the residuals of a long AR model
+            h = min(max(20, 2*(self.p_order + self.q_order)), x.shape[-1] // 4)
+            phi, _, _ = levinson_durbin(acovf(x, h, demean=False), h)
+            noise = residuals(x, phi, numpy.zeros(x.shape[:-1] + (0,)))
+            start = h + self.q_order
+            for _ in range(self.n_iter + 1):
+                coefs = _regress(x, x, self.p_order, noise, self.q_order, start)
+                self.p, self.q = coefs[..., :self.p_order], coefs[..., self.p_order:]
+                noise = residuals(x, self.p, self.q)
+                start = max(self.p_order, self.q_order)
+        m = max(self.p_order, self.q_order)
+        self.sigma2 = numpy.mean(residuals(x, self.p, self.q)[..., m:]**2, axis=-1)
+        return self
+    
+    def residuals(self, x):
+        """Conditional residuals (estimated noise) of a serie, for the fitted model"""
+        x = _as_values(x).astype(float) - numpy.asarray(self.mean)[..., None]
+        return residuals(x, self.p, self.q)
+    
+    def simulate(self, size, **kwargs):
+        """Generate a serie from the fitted model (see ARMA_generator for the arguments)"""
+        from ..series.generator import ARMA_generator, _generate_timeline
+        if numpy.ndim(self.p) > 1:
+            raise ValueError("Can't simulate from a batch of models")
+        # sigma2 is the variance per sample: cancel the rescaling of ARMA_generator to
+        # the sampling period of a dated timeline
+        _, delta_t = _generate_timeline(size, dict((key, value) for key, value in kwargs.items()
+                                                   if key in ('start_date', 'end_date', 'by')))
+        serie = ARMA_generator(size, list(self.p), list(self.q) or [0],
+                               noise_params={'scale': numpy.sqrt(self.sigma2) * delta_t}, **kwargs)
+        serie.values += self.mean
+        return serie
+
+def residuals(x, p, q):
+    """Conditional residuals of an ARMA model, the noise before the start being zero:
+    e[t] = x[t] - sum_i p[i]*x[t-1-i] - sum_j q[j]*e[t-1-j] for t >= max(len(p), len(q))
+    #Arguments:
+        x: array (1D or 2D, along the last axis), the centered serie(s)
+        p, q: arrays of shape (p_order,) and (q_order,), or (n_series, p_order) and
+            (n_series, q_order) for a batch
+    """
+    p, q = numpy.asarray(p, dtype=float), numpy.asarray(q, dtype=float)
+    p_order, q_order = p.shape[-1], q.shape[-1]
+    m = max(p_order, q_order)
+    u = numpy.zeros_like(x)
+    u[..., m:] = x[..., m:]
+    for i in range(p_order):
+        u[..., m:] -= p[..., i:i+1] * x[..., m-1-i:x.shape[-1]-1-i]
+    if q_order == 0:
+        return u
+    if q.ndim == 1:
+        return arma_filter(u, -q, [], start=m)
+    # The MA inversion is a recursion with different coefficients for each serie:
+    # the loop is on time, vectorized across the series
+    e = numpy.ascontiguousarray(u.T) # Time major, so each step reads contiguous rows
+    q = q.T[::-1]
+    for t in range(m, x.shape[-1]):
+        e[t] -= numpy.einsum('ij,ij->j', q, e[t-q_order:t])
+    return e.T
+
+def fit_many(series, p_order, q_order=0, processes=None, **kwargs):
+    """Fit an ARMA model to each serie of a collection of series of different lengths,
+    on several processes.
+    #Arguments:
+        series: list of series_1d objects or 1D arrays
+        p_order, q_order: int, the orders of the model
+        processes: int, the number of processes (default is the number of cores)
+        kwargs: other arguments of ARMA_model
+    
+    Return a list of fitted ARMA_model objects.
+    """
+    import multiprocessing # Only needed (and imported) for pools
+    tasks = [(_as_values(s), p_order, q_order, kwargs) for s in series]
+    if processes == 1:
+        return [_fit_one(task) for task in tasks]
+    pool = multiprocessing.Pool(processes)
+    try:
+        chunksize = max(1, len(tasks) // (4 * (processes or multiprocessing.cpu_count())))
+        return pool.map(_fit_one, tasks, chunksize=chunksize)
+    finally:
+        pool.close()
+        pool.join()
+
+def _fit_one(task):
+    """Internal function, fit one model (top-level to be used by a process pool)"""
+    x, p_order, q_order, kwargs = task
+    return ARMA_model(p_order, q_order, **kwargs).fit(x)
+
+def _regress(y, x, p_order, noise, q_order, start):
+    """Internal function, least squares regression of y[t] on x[t-1..t-p_order] and
+    noise[t-1..t-q_order], for t >= start. The normal equations are built with one
+    vectorized product per pair of regressors, and solved for all the series at once."""
+    N = y.shape[-1]
+    regressors = [x[..., start-1-i:N-1-i] for i in range(p_order)]
+    regressors += [noise[..., start-1-j:N-1-j] for j in range(q_order)]
+    k = len(regressors)
+    target = y[..., start:]
+    gram = numpy.empty(y.shape[:-1] + (k, k))
+    rhs = numpy.empty(y.shape[:-1] + (k,))
+    for a in range(k):
+        rhs[..., a] = numpy.einsum('...i,...i->...', regressors[a], target)
+        for b in range(a, k):
+            gram[..., a, b] = gram[..., b, a] = numpy.einsum('...i,...i->...', regressors[a], regressors[b])
+    return numpy.linalg.solve(gram, rhs[..., None])[..., 0]
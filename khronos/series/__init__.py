@@ -1 +1,6 @@
 from .series_1d import series_1d
+from .series_panel import series_panel
+from .storage import save_series, save_chunks, open_series
+from .series_stream import series_stream
+from .loader import read_csv, read_csv_chunks
+from .resampling import resample, align
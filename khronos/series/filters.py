@@ -0,0 +1,163 @@
+import numpy
+from ..utils.instrumentation import instrumented
+
+@instrumented('arma_filter')
+def arma_filter(noise, p, q, start=0, block_size=256, initial=None):
+    """Apply the ARMA recursion to a noise array, along its last axis.
+
+    Compute y[t] = e[t] + sum_i p[i]*y[t-1-i] + sum_j q[j]*e[t-1-j] for t >= `start`,
+    and y[t] = e[t] before `start`. This is the same recursion as a step by step loop,
+    but the MA part is a vectorized convolution and the AR part (IIR) is solved block
+    by block with a Toeplitz matrix product, so the Python overhead is O(N/block_size).
+
+    #Arguments:
+        noise: array of shape (N,) or (n_paths, N), the white noise e.
+        p: list, the coefficients for the AR part of the model, or dictionary {lag: coefficient}
+            for sparse lags (lags start at 1, so the list [a, b] is the dictionary {1: a, 2: b})
+        q: list or dictionary, the coefficients for the MA part of the model
+        start: int, first index on which the recursion is applied. Must be at
+            least the order of the model (the largest lag of p and q).
+        block_size: int, length of the blocks used to solve the AR recursion
+        initial: array of shape (start,) or (n_paths, start), the values of the serie
+            before `start`, to continue the recursion of a previous call (default is the
+            noise itself)
+
+    The cost depends on the number of non-zero lags, not on the order: an AR part with
+    lags larger than `block_size` is solved block by block, the large lags only involving
+    the previous blocks.
+
+    Return an array of the same shape as `noise`.
+    """
+    e = numpy.asarray(noise)
+    dtype = numpy.result_type(e.dtype, numpy.float32)
+    e = e.astype(dtype, copy=False)
+    N = e.shape[-1]
+    if start < max(lag_order(p), lag_order(q)):
+        raise ValueError("'start' should be at least the order of the model")
+
+    #MA part: one vectorized pass per (non-zero) coefficient
+    values = numpy.array(e, dtype=dtype)
+    if initial is not None:
+        values[..., :start] = initial
+    if start >= N:
+        return values
+    for lag, coef in zip(*_lags(q, dtype)):
+        values[..., start:] += coef * e[..., start-lag:N-lag]
+
+    lags, coefs = _lags(p, dtype)
+    if not len(lags):
+        return values
+    if lags[-1] > block_size:
+        return _sparse_ar_filter(values, lags, coefs, start, block_size)
+    return _ar_filter(values, _dense(lags, coefs, lags[-1], dtype), start, block_size)
+
+def lag_order(c):
+    """Order (largest lag) of a lag polynomial, given as a list of coefficients (lag 1 first)
+    or as a dictionary {lag: coefficient}"""
+    if isinstance(c, dict):
+        return max(c.keys()) if c else 0
+    return len(c)
+
+def _lags(c, dtype):
+    """Internal function, the non-zero lags (in increasing order) and coefficients of a
+    lag polynomial given as a list or a dictionary"""
+    if isinstance(c, dict):
+        lags = numpy.array(sorted(lag for lag in c if c[lag] != 0), dtype=int)
+        if len(lags) and lags[0] < 1:
+            raise ValueError("Lags should be positive integers")
+        return lags, numpy.array([c[lag] for lag in lags], dtype=dtype)
+    c = numpy.asarray(c, dtype=dtype).ravel()
+    nonzero = numpy.flatnonzero(c)
+    return nonzero + 1, c[nonzero]
+
+def _dense(lags, coefs, order, dtype):
+    """Internal function, coefficients of the lags 1 to `order` as a dense vector"""
+    p = numpy.zeros(order, dtype=dtype)
+    p[lags - 1] = coefs
+    return p
+
+def _ar_filter(x, p, start, block_size):
+    """Internal function, solve y[t] = x[t] + sum_i p[i]*y[t-1-i] in place for t >= start"""
+    P = len(p)
+    shape = x.shape
+    y = x.reshape(-1, shape[-1])
+    M = shape[-1] - start
+    B = min(block_size, M)
+    n_blocks = -(-M // B) #Ceil division
+
+    # Impulse response of the AR filter, and upper triangular Toeplitz matrix T
+    # such that a block of y (as a row vector) is block_x @ T
+    h = _impulse_response(p, B).astype(y.dtype)
+    T = _toeplitz(h)
+    # Response of a block to the P values preceding it
+    G = numpy.dot(_state_injection(p, B), T)
+
+    # Zero-state response of every block in one matrix product
+    blocks = numpy.zeros((y.shape[0], n_blocks * B), dtype=y.dtype)
+    blocks[:, :M] = y[:, start:]
+    blocks = numpy.dot(blocks.reshape(-1, B), T).reshape(y.shape[0], n_blocks, B)
+
+    # Propagate the state across blocks (sequential, but only n_blocks steps)
+    state = y[:, start-P:start]
+    for b in range(n_blocks):
+        blocks[:, b] += numpy.dot(state, G)
+        if B >= P:
+            state = blocks[:, b, B-P:]
+        else:
+            state = numpy.concatenate((state[:, B:], blocks[:, b]), axis=1)
+    y[:, start:] = blocks.reshape(y.shape[0], -1)[:, :M]
+    return y.reshape(shape)
+
+def _sparse_ar_filter(x, lags, coefs, start, block_size):
+    """Internal function, same as _ar_filter for sparse lags, some larger than the blocks.
+    The lags of at least `block_size` only involve the previous blocks, so their contribution
+    to a block is added to it before solving the recursion of the short lags in the block"""
+    shape = x.shape
+    y = x.reshape(-1, shape[-1])
+    N, B = y.shape[-1], block_size
+    short = lags < B
+    long_lags, long_coefs = lags[~short], coefs[~short]
+    P = lags[short][-1] if short.any() else 0
+    if P:
+        p = _dense(lags[short], coefs[short], P, y.dtype)
+        T = _toeplitz(_impulse_response(p, B).astype(y.dtype))
+        G = numpy.dot(_state_injection(p, B), T)
+    block = numpy.zeros((y.shape[0], B), dtype=y.dtype) # The last block is padded with zeros
+    for s in range(start, N, B):
+        m = min(B, N - s)
+        block[:, :m] = y[:, s:s+m]
+        for lag, coef in zip(long_lags, long_coefs):
+            block[:, :m] += coef * y[:, s-lag:s+m-lag]
+        if P:
+            y[:, s:s+m] = (numpy.dot(block, T) + numpy.dot(y[:, s-P:s], G))[:, :m]
+        else:
+            y[:, s:s+m] = block[:, :m]
+    return y.reshape(shape)
+
+def _impulse_response(p, B):
+    """Internal function, first `B` points of the impulse response of the AR filter.
+    The length is doubled at each step: the second half is the response to the
+    state left by the first half."""
+    P = len(p)
+    h = numpy.ones(1)
+    while len(h) < B:
+        k = len(h)
+        state = numpy.zeros(P)
+        last = h[-P:]
+        state[P-len(last):] = last
+        h = numpy.concatenate((h, numpy.dot(state, numpy.dot(_state_injection(p, k), _toeplitz(h)))))
+    return h[:B]
+
+def _toeplitz(h):
+    """Internal function, upper triangular Toeplitz matrix with T[m, k] = h[k-m]"""
+    B = len(h)
+    padded = numpy.concatenate((numpy.zeros(B - 1, dtype=h.dtype), h))
+    # The rows are reversed sliding windows of the padded impulse response (no copy)
+    return numpy.lib.stride_tricks.sliding_window_view(padded, B)[::-1]
+
+def _state_injection(p, B):
+    """Internal function, matrix D of shape (P, B) such that the P values preceding a
+    block contribute `state @ D` to the first points of the block (before filtering)"""
+    P = len(p)
+    l, k = numpy.arange(P)[:, None], numpy.arange(B)[None, :]
+    return numpy.where(k <= l, p[numpy.clip(k + P - 1 - l, 0, P - 1)], 0)
@@ -1,94 +1,367 @@
-from ..series import series_1d
+from ..series import series_1d, series_panel
 from ..utils.time_utils import generate_timeline
+from ..utils.instrumentation import instrumented
+from .filters import arma_filter, lag_order
 import numpy
 
-def gaussian_noise(size, scale=1, **kwargs):
+# Paths are drawn by blocks, each block from its own random stream (a child of the seed),
+# so that any subset of blocks can be generated independently (see generate_parallel)
+_PATHS_PER_STREAM = 256
+# Default length of the blocks of arma_filter
+_FILTER_BLOCK = 256
+_MIN_BLOCKS = 16
+
+def gaussian_noise(size, scale=1, n_paths=None, seed=None, dtype=None, path_offset=0, **kwargs):
     """Generate a gaussian noise (independant gaussian vector) of a given size, as a series_1d object
     
     # Arguments:
         size: int, the size of the time serie to generate
         scale: the standard deviation of the gaussian noise (yearly if a dated timeline is used)
+        n_paths: int, if given, generate `n_paths` independant series at once and return them
+            as a series_panel object sharing the same timeline
+        seed: int, numpy SeedSequence or Generator, the seed of the random streams
+            (the global numpy.random state is used if None). A Generator is drawn from,
+            so successive calls with the same Generator give different samples
+        dtype: the numpy dtype of the values (default is float64)
+        path_offset: int, index of the first path, to generate a part of a larger batch
+            of paths with the same seed (must be a multiple of 256)
         kwargs: arguments to generate a dated timeline (see series_1d arguments)
     """
-    if any(e in kwargs.keys() for e in ('start_date', 'by', 'end_date')):
-        # A dated timeline will be generated
-        timeline, delta_t = generate_timeline(size, **kwargs)
-    else:
-        timeline, delta_t = range(size), 1 # 1 sample each unit of time by default
+    timeline, delta_t = _generate_timeline(size, kwargs)
     # Need to recale the yearly standard deviation
-    values = _noise_generator('gaussian', size=size, param_dict={'scale':scale*numpy.sqrt(delta_t)})
-    return series_1d(values, timeline, name="Gaussian noise (scale={})".format(scale))
+    values = _noise('gaussian', size, n_paths, {'scale':scale*numpy.sqrt(delta_t)}, seed, dtype, path_offset)
+    return _wrap(values, timeline, "Gaussian noise (scale={})".format(scale))
 
-def laplacian_noise(size, scale=1, **kwargs):
+def laplacian_noise(size, scale=1, n_paths=None, seed=None, dtype=None, path_offset=0, **kwargs):
     """Generate a laplacian noise (difference between two exponential variables) of a given size, as a series_1d object
     
     # Arguments:
         size: int, the size of the time serie to generate
         scale: the standard deviation of the gaussian noise (yearly if a dated timeline is used)
+        n_paths: int, if given, generate `n_paths` independant series at once and return them
+            as a series_panel object sharing the same timeline
+        seed: int, numpy SeedSequence or Generator, the seed of the random streams
+            (the global numpy.random state is used if None). A Generator is drawn from,
+            so successive calls with the same Generator give different samples
+        dtype: the numpy dtype of the values (default is float64)
+        path_offset: int, index of the first path, to generate a part of a larger batch
+            of paths with the same seed (must be a multiple of 256)
         kwargs: arguments to generate a dated timeline (see series_1d arguments)
     """
-    if any(e in kwargs.keys() for e in ('start_date', 'by', 'end_date')):
-        # A dated timeline will be generated
-        timeline, delta_t = generate_timeline(size, **kwargs)
-    else:
-        timeline, delta_t = range(size), 1 # 1 sample each unit of time by default
+    timeline, delta_t = _generate_timeline(size, kwargs)
     # Need to recale the yearly standard deviation
-    values = _noise_generator('laplace', size=size, param_dict={'scale':scale*numpy.sqrt(delta_t)})
-    return series_1d(values, timeline, name="Laplacian noise (scale={})".format(scale))
+    values = _noise('laplace', size, n_paths, {'scale':scale*numpy.sqrt(delta_t)}, seed, dtype, path_offset)
+    return _wrap(values, timeline, "Laplacian noise (scale={})".format(scale))
 
-def ARMA_generator(size, p, q, noise='gaussian', noise_params={}, **kwargs):
-    """Generate an ARMA serie, step by step.
+@instrumented('ARMA_generator')
+def ARMA_generator(size, p, q, noise='gaussian', noise_params={}, n_paths=None,
+                   seed=None, dtype=None, path_offset=0, **kwargs):
+    """Generate an ARMA serie, using a vectorized linear filter (see filters.arma_filter).
     #Arguments:
         size: int, the size of the serie to generate
-        p: list, the coefficients for the AR part of the model
-        q: list, the coefficients for the MA part of the model
+        p: list, the coefficients for the AR part of the model (or dictionary {lag: coefficient}
+            for sparse lags, see filters.arma_filter)
+        q: list or dictionary, the coefficients for the MA part of the model
         noise: the white noise to apply to the ARMA serie. Can be a distribution name,
             a numpy random sample generator, or an array of size 'size' containing a 
-            pre-computed white noise.
+            pre-computed white noise (of shape (n_paths, size) if `n_paths` is given).
+            The pre-sample noise is then the end of the array, repeated if the order of
+            the model is larger than `size`.
         noise_params: If applicable, a dictionnary containing parameters for the noise generator
+        n_paths: int, if given, generate `n_paths` independant series at once and return them
+            as a series_panel object sharing the same timeline
+        seed: int, numpy SeedSequence or Generator, the seed of the random streams when
+            `noise` is a distribution name (the global numpy.random state is used if None).
+            A Generator is drawn from, so successive calls give different samples
+        dtype: the numpy dtype of the values (default is float64)
+        path_offset: int, index of the first path, to generate a part of a larger batch
+            of paths with the same seed (must be a multiple of 256)
     """
     #Generate a timeline and rescale the noise accordingly
-    if any(e in kwargs.keys() for e in ('start_date', 'by', 'end_date')):
-        # A dated timeline will be generated
-        timeline, delta_t = generate_timeline(size, **kwargs)
-        if 'scale' in noise_params.keys():
-            noise_params['scale'] /= delta_t
-    else:
-        timeline, delta_t = range(size), 1 # 1 sample each unit of time by default
+    timeline, delta_t = _generate_timeline(size, kwargs)
+    noise_params = _scaled_params(noise_params, timeline, delta_t)
         
-    p_order, q_order = len(p), len(q)
+    p_order, q_order = lag_order(p), lag_order(q)
     max_order = max(p_order, q_order)
-    #We need to invert the coefficients order to perform vectorial multiplication
-    p, q = numpy.array(p)[::-1], numpy.array(q)[::-1]
     
     #We draw noise 'max_order' before the beginning of the serie (or replicate the end of the noise array)
     if isinstance(noise, str):
-        noise_samples = _noise_generator(noise, size=size+max_order, param_dict=noise_params)
+        noise_samples = _noise(noise, size+max_order, n_paths, noise_params, seed, dtype, path_offset)
     elif isinstance(noise, numpy.ndarray):
-        if len(noise) != size:
-            raise ValueError("Noise array is not of length 'size'")
-        noise_samples = numpy.append(noise[-max_order:],noise)
+        if noise.shape != _shape(size, n_paths):
+            raise ValueError("Noise array is not of shape {}".format(_shape(size, n_paths)))
+        noise_samples = numpy.append(_presample(noise, -max_order, 0), noise, axis=-1)
     else:
         try:
-            noise_samples = noise(size=size+max_order, **noise_params)
+            noise_samples = noise(size=_shape(size+max_order, n_paths), **noise_params)
         except:
             raise ValueError("Khronos don't know how to deal with {} type".format(type(noise)))
-    values = numpy.array(noise_samples)
-    for time in range(max_order + 1,max_order + size):
-        AR_part = numpy.dot(p, values[time-p_order:time])
-        MA_part = numpy.dot(q, noise_samples[time-q_order:time])
-        values[time] += AR_part + MA_part
-
-    return series_1d(values[max_order:],
-                     timeline,
-                     name="ARMA ({},{})".format(p_order, q_order))
-
-def _noise_generator(distrib, size=1, param_dict={}):
-    """Internal function, will return a random sample from the distribution given"""
-    distrib_dict = {'gaussian':numpy.random.normal,
-                    'normal':numpy.random.normal,
-                    'laplace':numpy.random.laplace}
+    if dtype is not None:
+        noise_samples = numpy.asarray(noise_samples, dtype=dtype)
+    #The recursion starts one step after the pre-sample noise, and is run for all paths at once
+    #(by blocks of paths when seeded, so that each path does not depend on the others)
+    if seed is None or noise_samples.ndim == 1:
+        values = arma_filter(noise_samples, p, q, start=max_order+1)
+    else:
+        values = numpy.concatenate([arma_filter(noise_samples[i:i+_PATHS_PER_STREAM], p, q, start=max_order+1)
+                                    for i in range(0, len(noise_samples), _PATHS_PER_STREAM)])
+
+    return _wrap(values[..., max_order:],
+                 timeline,
+                 "ARMA ({},{})".format(p_order, q_order))
+
+def SARIMA_generator(size, p, q, d=0, P=[], Q=[], D=0, season=None, **kwargs):
+    """Generate a seasonal ARIMA serie (p,d,q)x(P,D,Q)_season, whose lag polynomials are
+    phi(B) * PHI(B^season) * (1-B)^d * (1-B^season)^D for the AR part and
+    theta(B) * THETA(B^season) for the MA part. The products are kept sparse, so the cost
+    depends on the number of non-zero lags and not on the season (see filters.arma_filter):
+    an hourly serie with a yearly season (8760) is as fast to generate as a short ARMA.
+    #Arguments:
+        size: int, the size of the serie to generate
+        p: list or dictionary {lag: coefficient}, the coefficients for the AR part of the model
+        q: list or dictionary, the coefficients for the MA part of the model
+        d: int, the number of differences (the ARMA serie is integrated `d` times)
+        P: list or dictionary, the coefficients of the seasonal AR part, the lag 1 being `season`
+        Q: list or dictionary, the coefficients of the seasonal MA part
+        D: int, the number of seasonal differences
+        season: int, the period of the season (in number of samples)
+        kwargs: other arguments of ARMA_generator (noise, seed, n_paths, timeline...)
+    """
+    if season is None and (P or Q or D):
+        raise ValueError("A 'season' is needed for the seasonal part of the model")
+    season = season or 1
+    ar = _product(_polynomial(p, -1), _polynomial(P, -1, season), *([{0: 1., 1: -1.}]*d + [{0: 1., season: -1.}]*D))
+    ma = _product(_polynomial(q, 1), _polynomial(Q, 1, season))
+    serie = ARMA_generator(size, _coefficients(ar, -1), _coefficients(ma, 1), **kwargs)
+    serie.name = "SARIMA ({},{},{})x({},{},{})_{}".format(lag_order(p), d, lag_order(q),
+                                                         lag_order(P), D, lag_order(Q), season)
+    return serie
+
+def ARMA_chunks(size, p, q, chunk_size=2**20, noise='gaussian', noise_params={},
+                seed=None, dtype=None, **kwargs):
+    """Generate an ARMA serie chunk by chunk, as an iterator of series_1d objects of
+    `chunk_size` values (the last one can be shorter). The state of the filter (the last
+    values of the noise and of the serie) is carried from one chunk to the next, so the
+    chunks put end to end are the serie given by `ARMA_generator` with the same arguments
+    and seed, while the memory used only depends on `chunk_size`. The chunks can be
+    written to disk as they come with storage.save_chunks.
+    #Arguments:
+        size: int, the size of the serie to generate
+        p: list or dictionary {lag: coefficient}, the coefficients for the AR part of the model
+        q: list or dictionary, the coefficients for the MA part of the model
+        chunk_size: int, the number of values of each chunk
+        noise: a distribution name, a numpy random sample generator, or an array
+            (possibly memory-mapped) of size 'size' containing a pre-computed white noise
+        noise_params: If applicable, a dictionnary containing parameters for the noise generator
+        seed: int, numpy SeedSequence or Generator, the seed of the random stream when
+            `noise` is a distribution name (the global numpy.random state is used if None).
+            A Generator is drawn from, so successive calls give different samples
+        dtype: the numpy dtype of the values (default is float64)
+        kwargs: arguments to generate a dated timeline (see series_1d arguments)
+    """
+    if chunk_size < 1:
+        raise ValueError("'chunk_size' should be a positive integer")
+    timeline, delta_t = _generate_timeline(size, kwargs)
+    noise_params = _scaled_params(noise_params, timeline, delta_t)
+    if timeline is None:
+        timeline = range(size)
+    name = "ARMA ({},{})".format(lag_order(p), lag_order(q))
+    order = max(lag_order(p), lag_order(q))
+    draw = _noise_reader(noise, size, order, noise_params, seed, dtype)
+    
+    # The recursion is solved by segments made of whole blocks of arma_filter, aligned on
+    # the blocks of a one-shot generation, so that the values are exactly the same. The
+    # segments have at least _MIN_BLOCKS blocks (and the last one is merged with the one
+    # before if shorter), as the matrix products of a few blocks are not rounded the same way
+    block = min(_FILTER_BLOCK, max(size - 1, 1))
+    segment = max(-(-chunk_size // block), _MIN_BLOCKS) * block
+    # Pre-sample noise and first value of the serie (not filtered, as in ARMA_generator)
+    e = draw(order + 1)
+    y = arma_filter(e, p, q, start=order + 1)
+    chunk, filled, produced = None, 0, 0
+    pending, remaining = y[order:], size - 1
+    while True:
+        # Copy the values computed in the chunks, yielding the full ones
+        while len(pending):
+            if chunk is None:
+                chunk = numpy.empty(min(chunk_size, size - produced), dtype=pending.dtype)
+            n = min(len(pending), len(chunk) - filled)
+            chunk[filled:filled+n] = pending[:n]
+            pending, filled = pending[n:], filled + n
+            if filled == len(chunk):
+                yield series_1d._from_sorted(chunk, timeline[produced:produced+filled], name=name)
+                chunk, filled, produced = None, 0, produced + filled
+        if remaining == 0:
+            return
+        # Next segment, after the last `order` values of the noise and of the serie
+        n = segment if remaining >= 2 * segment else remaining
+        padding = -n % block # The last block is padded with zeros, as in a one-shot filtering
+        new = draw(n)
+        x = numpy.concatenate((e[len(e)-order:], new, numpy.zeros(padding, dtype=new.dtype)))
+        y = arma_filter(x, p, q, start=order, initial=y[len(y)-order:])
+        e, y = x[:order+n], y[:order+n]
+        pending, remaining = y[order:], remaining - n
+
+def generate_parallel(function, size, n_paths, seed, processes=None, **kwargs):
+    """Generate `n_paths` paths with a generator function (gaussian_noise, laplacian_noise or
+    ARMA_generator) on a pool of processes. The paths are drawn from random streams spawned
+    from `seed`, so the result is the same as `function(size, n_paths=n_paths, seed=seed, ...)`
+    whatever the number of processes.
+    #Arguments:
+        function: the generator function
+        size: int, the size of each path
+        n_paths: int, the number of paths
+        seed: int or numpy SeedSequence, the seed of the random streams
+        processes: int, the number of processes (default is the number of cores)
+        kwargs: other arguments of the generator function
+    """
+    import multiprocessing # Only needed (and imported) for pools
+    if isinstance(seed, numpy.random.Generator):
+        raise ValueError("Use an int or a SeedSequence as a seed, a Generator can't be shared between processes")
+    processes = processes or multiprocessing.cpu_count()
+    n_blocks = -(-n_paths // _PATHS_PER_STREAM)
+    bounds = [min(n_paths, _PATHS_PER_STREAM * (n_blocks * i // processes)) for i in range(processes + 1)]
+    tasks = [(function, size, end - start, seed, start, kwargs)
+             for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+    pool = multiprocessing.Pool(min(processes, len(tasks)))
+    try:
+        parts = pool.map(_generate_part, tasks)
+    finally:
+        pool.close()
+        pool.join()
+    return series_panel._from_sorted(numpy.concatenate([part.values for part in parts]),
+                                     parts[0].timeline, name=parts[0].name)
+
+def _generate_part(task):
+    """Internal function, generate a part of the paths (top-level to be used by a process pool)"""
+    function, size, n_paths, seed, path_offset, kwargs = task
+    part = function(size, n_paths=n_paths, seed=seed, path_offset=path_offset, **kwargs)
+    if isinstance(part, series_1d): # A single path
+        return series_panel._from_sorted(part.values[None], part.timeline, name=part.name)
+    return part
+
+def _generate_timeline(size, kwargs):
+    """Internal function, return a dated timeline if asked in `kwargs` (None otherwise)
+    and the sampling period"""
+    if any(e in kwargs.keys() for e in ('start_date', 'by', 'end_date')):
+        # A dated timeline will be generated
+        return generate_timeline(size, **kwargs)
+    return None, 1 # 1 sample each unit of time by default
+
+def _scaled_params(noise_params, timeline, delta_t):
+    """Internal function, the parameters of the noise with the scale rescaled to the
+    sampling period of a dated timeline (without modifying `noise_params`)"""
+    if timeline is not None and 'scale' in noise_params.keys():
+        return dict(noise_params, scale=noise_params['scale'] / delta_t)
+    return noise_params
+
+def _noise_reader(noise, size, order, noise_params, seed, dtype):
+    """Internal function, return a function drawing the next `n` values of the noise of a
+    single path, the same values as ARMA_generator draws in one go (`order` pre-sample
+    values, then `size` values)"""
+    if isinstance(noise, str):
+        if seed is None:
+            return lambda n: _noise(noise, n, None, noise_params, None, dtype, 0)
+        root = _seed_sequence(seed)
+        rng = numpy.random.default_rng(numpy.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (0,)))
+        return lambda n: numpy.asarray(_noise_generator(noise, size=(n,), param_dict=noise_params, rng=rng,
+                                                        dtype=numpy.dtype(dtype or float)), dtype=dtype or float)
+    if isinstance(noise, numpy.ndarray):
+        if noise.shape != (size,):
+            raise ValueError("Noise array is not of shape {}".format((size,)))
+        position = [-order] # The pre-sample noise is the end of the array
+        def read(n):
+            start, position[0] = position[0], position[0] + n
+            values = numpy.concatenate((_presample(noise, start, min(0, start+n)), noise[max(0, start):max(0, start+n)]))
+            return values if dtype is None else values.astype(dtype)
+        return read
+    if not callable(noise):
+        raise ValueError("Khronos don't know how to deal with {} type".format(type(noise)))
+    return lambda n: numpy.asarray(noise(size=(n,), **noise_params), dtype=dtype)
+
+def _polynomial(c, sign, season=1):
+    """Internal function, the lag polynomial {lag: coefficient} (1 at the lag 0) of AR (sign=-1)
+    or MA (sign=1) coefficients given as a list or a dictionary, the lags multiplied by `season`"""
+    polynomial = {0: 1.}
+    for lag, coef in (c.items() if isinstance(c, dict) else enumerate(c, 1)):
+        if coef:
+            polynomial[lag*season] = polynomial.get(lag*season, 0.) + sign*coef
+    return polynomial
+
+def _product(*polynomials):
+    """Internal function, product of sparse lag polynomials"""
+    result = {0: 1.}
+    for polynomial in polynomials:
+        product = {}
+        for lag_a, coef_a in result.items():
+            for lag_b, coef_b in polynomial.items():
+                product[lag_a+lag_b] = product.get(lag_a+lag_b, 0.) + coef_a*coef_b
+        result = product
+    return result
+
+def _coefficients(polynomial, sign):
+    """Internal function, the coefficients {lag: coefficient} of the recursion from a lag polynomial
+    (the non-zero lags only)"""
+    return dict((lag, sign*coef) for lag, coef in polynomial.items() if lag and coef != 0)
+
+def _presample(noise, start, end):
+    """Internal function, the pre-sample noise of indices start to end (negative) before
+    a noise array: the end of the array, repeated as many times as needed"""
+    return numpy.take(noise, numpy.arange(start, end), axis=-1, mode='wrap')
+
+def _shape(size, n_paths):
+    """Internal function, shape of the samples to draw"""
+    return (size,) if n_paths is None else (n_paths, size)
+
+def _wrap(values, timeline, name):
+    """Internal function, wrap the generated values as a series_1d or a series_panel"""
+    if values.ndim == 1:
+        return series_1d(values, timeline, name=name)
+    return series_panel(values, timeline, name=name)
+
+@instrumented('noise')
+def _noise(distrib, size, n_paths, param_dict, seed, dtype, path_offset):
+    """Internal function, draw the noise of `n_paths` paths (or of a single path if None).
+    With a seed, each block of _PATHS_PER_STREAM paths is drawn from its own stream."""
+    if seed is None:
+        values = _noise_generator(distrib, size=_shape(size, n_paths), param_dict=param_dict)
+        return values if dtype is None else values.astype(dtype)
+    if path_offset % _PATHS_PER_STREAM:
+        raise ValueError("'path_offset' should be a multiple of {}".format(_PATHS_PER_STREAM))
+    root = _seed_sequence(seed)
+    values = numpy.empty(_shape(size, n_paths), dtype=dtype or float)
+    rows = values.reshape(-1, size)
+    for start in range(0, len(rows), _PATHS_PER_STREAM):
+        stream = (path_offset + start) // _PATHS_PER_STREAM
+        rng = numpy.random.default_rng(numpy.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (stream,)))
+        block = rows[start:start+_PATHS_PER_STREAM]
+        block[...] = _noise_generator(distrib, size=block.shape, param_dict=param_dict, rng=rng, dtype=block.dtype)
+    return values
+
+def _seed_sequence(seed):
+    """Internal function, the SeedSequence of a seed (int, SeedSequence or Generator)
+    A Generator gives a new SeedSequence at each call."""
+    if isinstance(seed, numpy.random.SeedSequence):
+        return seed
+    if isinstance(seed, numpy.random.Generator):
+        # Entropy drawn from the Generator, so each call advances its state
+        return numpy.random.SeedSequence(seed.integers(2**63, size=4))
+    return numpy.random.SeedSequence(seed)
+
+def _noise_generator(distrib, size=1, param_dict={}, rng=None, dtype=None):
+    """Internal function, will return a random sample from the distribution given
+    (from the global numpy.random state, or from the Generator `rng`)"""
+    if distrib in ('gaussian', 'normal') and rng is not None:
+        # Drawn directly in the requested precision (float32 or float64)
+        sample = rng.standard_normal(size=size, dtype=dtype or numpy.float64)
+        sample *= param_dict.get('scale', 1)
+        sample += param_dict.get('loc', 0)
+        return sample
+    source = numpy.random if rng is None else rng
+    distrib_dict = {'gaussian':source.normal,
+                    'normal':source.normal,
+                    'laplace':source.laplace}
     if distrib not in distrib_dict.keys():
         raise ValueError("{} is not an available distribution shortcut for now. \
                          Please give the numpy function instead.".format(distrib))
-    return distrib_dict[distrib](size=size, **param_dict)
\ No newline at end of file
+    return distrib_dict[distrib](size=size, **param_dict)
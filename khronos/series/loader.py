@@ -0,0 +1,89 @@
+"""Bulk loading of time series from CSV/text files.
+
+The file is read by chunks of lines: each chunk is split by numpy, its values
+converted at once, and its dates parsed at once with a format inferred once
+from the first lines (see time_utils.parse_dates).
+"""
+from __future__ import absolute_import
+
+import io
+import itertools
+import numpy
+from ..utils.time_utils import infer_date_format, parse_dates, irregular_timeline
+from .series_1d import series_1d
+
+def read_csv_chunks(path, date_column=0, value_column=1, delimiter=',', header=False,
+                    date_format=None, chunk_size=10**6, name=None):
+    """Read a CSV/text file by chunks of `chunk_size` lines, and yield each chunk as a
+    series_1d object. Only one chunk is in memory at once.
+    
+    #Arguments:
+        path: string, the file to read (or an open text file)
+        date_column: int or string (if `header` is True), the column of the dates, or
+            None if the file has no dates
+        value_column: int or string (if `header` is True), the column of the values
+        delimiter: string, the delimiter of the columns
+        header: boolean, True if the first line contains the names of the columns
+        date_format: string, the strptime format of the dates (inferred from the
+            first lines if None)
+        chunk_size: int, the number of lines of each chunk
+        name: string, the name of the series (default is the name of the value column
+            if `header` is True)
+    """
+    f = io.open(path) if isinstance(path, str) else path
+    try:
+        if header:
+            names = [n.strip() for n in f.readline().rstrip('\n').split(delimiter)]
+            date_column, value_column = (_column_index(names, c) for c in (date_column, value_column))
+            if name is None:
+                name = names[value_column]
+        columns = (value_column,) if date_column is None else (value_column, date_column)
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            lines = [l for l in lines if l.strip()]
+            if not lines:
+                break
+            table = numpy.loadtxt(lines, dtype=str, delimiter=delimiter, usecols=columns, ndmin=2)
+            values = table[:, 0].astype(float)
+            if date_column is None:
+                yield _chunk_series(values, range(len(values)), name)
+                continue
+            dates = numpy.char.strip(table[:, 1])
+            if date_format is None: # Only inferred once, on the first chunk
+                date_format = infer_date_format(dates[:100])
+            dates = parse_dates(dates, date_format)
+            yield _chunk_series(values, irregular_timeline(dates), name)
+    finally:
+        if f is not path:
+            f.close()
+
+def read_csv(path, date_column=0, value_column=1, delimiter=',', header=False,
+             date_format=None, chunk_size=10**6, name=None):
+    """Read a CSV/text file into a series_1d object (see read_csv_chunks for the arguments).
+    The file is read by chunks, so the memory used is the one of the values and dates
+    (8 bytes per point each), plus one chunk of text."""
+    values, dates = [], []
+    for chunk in read_csv_chunks(path, date_column, value_column, delimiter, header,
+                                 date_format, chunk_size, name):
+        values.append(chunk.values)
+        dates.append(None if date_column is None else chunk.timeline.to_array())
+    if not values:
+        raise ValueError("No data in {}".format(path))
+    values = numpy.concatenate(values)
+    if date_column is None:
+        return series_1d(values, name=chunk.name)
+    return series_1d(values, irregular_timeline(numpy.concatenate(dates)), name=chunk.name)
+
+def _column_index(names, column):
+    """Internal function, index of a column given by its name or index"""
+    if column is None or isinstance(column, int):
+        return column
+    if column not in names:
+        raise ValueError("No column named {}, the columns are {}".format(column, names))
+    return names.index(column)
+
+def _chunk_series(values, timeline, name):
+    """Internal function, series_1d of a chunk (the last chunk can have a single line)"""
+    if len(values) < 2:
+        return series_1d._from_sorted(values, timeline, name=name)
+    return series_1d(values, timeline, name=name)
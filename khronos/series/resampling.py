@@ -0,0 +1,156 @@
+"""Resampling of series on a regular grid, and alignment of two series on a common timeline.
+
+Timelines are handled as sorted numeric or datetime64 arrays. Alignments merge the two
+sorted timelines (a stable sort of two sorted runs, which is a linear merge), so they are
+O(N+M), and resampling is a single pass of reductions over contiguous bins.
+"""
+from __future__ import absolute_import
+
+import datetime
+import numpy
+from ..utils.time_utils import as_timeline, coerce_timedelta, regular_timeline, irregular_timeline
+from .series_1d import series_1d
+
+_AGGREGATIONS = ('mean', 'sum', 'min', 'max', 'first', 'last', 'count')
+
+def resample(serie, by, how='mean', fill=None, start=None):
+    """Resample a serie on a regular timeline.
+    
+    #Arguments:
+        serie: series_1d object
+        by: the period of the new timeline: a timedelta or coercible string (1d, 1m, 1y)
+            for a dated serie, a number for a numeric timeline
+        how: string, how the values of a period are computed: an aggregation of the
+            observations of the period ('mean', 'sum', 'min', 'max', 'first', 'last',
+            'count'), or 'interpolate' for the linear interpolation of the serie at the
+            start of each period
+        fill: string, how to fill periods without observations when aggregating:
+            None (NaN), 'ffill' (last value) or 'linear' (linear interpolation)
+        start: the start of the new timeline (default is the first date of the serie)
+    
+    Return a series_1d object with a regular_timeline.
+    """
+    if how not in _AGGREGATIONS + ('interpolate',):
+        raise ValueError("'how' should be one of {}, got {}".format(_AGGREGATIONS + ('interpolate',), how))
+    if fill not in (None, 'ffill', 'linear'):
+        raise ValueError("'fill' should be None, 'ffill' or 'linear', got {}".format(fill))
+    t = _timeline_array(serie)
+    values = numpy.asarray(serie.values, dtype=float)
+    dated = t.dtype.kind == 'M'
+    if dated:
+        if not isinstance(by, datetime.timedelta):
+            by = coerce_timedelta(by)
+        step = numpy.timedelta64(by, 'us')
+        start = t[0] if start is None else numpy.datetime64(start, 'us')
+    else:
+        step = by
+        start = t[0] if start is None else start
+    if not step > step*0:
+        raise ValueError("'by' should be a positive period")
+    
+    # Index of the period of each observation (the timeline is sorted)
+    keep = t >= start
+    t, values = t[keep], values[keep]
+    bins = ((t - start) // step).astype(numpy.int64)
+    n_bins = int(bins[-1]) + 1 if len(bins) else 0
+    if n_bins < 2:
+        raise ValueError("The resampled serie should have at least two periods")
+    timeline = regular_timeline(start, step, n_bins)
+    
+    if how == 'interpolate':
+        grid = timeline.to_array()
+        return series_1d._from_sorted(numpy.interp(_as_float(grid), _as_float(t), values),
+                                      timeline, name=serie.name)
+    
+    # Contiguous observations of each non-empty period, reduced at once
+    firsts = numpy.flatnonzero(numpy.r_[True, bins[1:] != bins[:-1]])
+    counts = numpy.diff(numpy.r_[firsts, len(bins)])
+    if how == 'mean':
+        reduced = numpy.add.reduceat(values, firsts) / counts
+    elif how == 'sum':
+        reduced = numpy.add.reduceat(values, firsts)
+    elif how == 'min':
+        reduced = numpy.minimum.reduceat(values, firsts)
+    elif how == 'max':
+        reduced = numpy.maximum.reduceat(values, firsts)
+    elif how == 'first':
+        reduced = values[firsts]
+    elif how == 'last':
+        reduced = values[firsts + counts - 1]
+    else:
+        reduced = counts.astype(float)
+    
+    filled = bins[firsts]
+    result = numpy.full(n_bins, 0.0 if how in ('count', 'sum') else numpy.nan)
+    result[filled] = reduced
+    if fill == 'ffill':
+        observed = numpy.zeros(n_bins, dtype=bool)
+        observed[filled] = True
+        result = result[numpy.maximum.accumulate(numpy.where(observed, numpy.arange(n_bins), 0))]
+    elif fill == 'linear':
+        result = numpy.interp(numpy.arange(n_bins), filled, reduced)
+    return series_1d._from_sorted(result, timeline, name=serie.name)
+
+def align(a, b, how='inner'):
+    """Put two series on a common timeline.
+    
+    #Arguments:
+        a, b: series_1d objects, with timelines of the same kind (dates or numbers)
+            and without duplicated dates
+        how: string, 'inner' (dates of both series), 'outer' (dates of any of the series,
+            the missing values are NaN) or 'asof' (dates of `a`, with the last value of
+            `b` observed at or before each date, NaN if none)
+    
+    Return two series_1d objects with the same timeline.
+    """
+    if how not in ('inner', 'outer', 'asof'):
+        raise ValueError("'how' should be 'inner', 'outer' or 'asof', got {}".format(how))
+    ta, tb = _timeline_array(a), _timeline_array(b)
+    if (ta.dtype.kind == 'M') != (tb.dtype.kind == 'M'):
+        raise ValueError("Can't align a dated serie with a numeric one")
+    va, vb = numpy.asarray(a.values), numpy.asarray(b.values)
+    
+    if how == 'asof':
+        # b is placed before a in the merge, so equal dates of b count as observed
+        merged, from_a, index = _merge(tb, ta)
+        last_b = numpy.maximum.accumulate(numpy.where(from_a, -1, index))
+        matched = last_b[from_a]
+        values = numpy.where(matched >= 0, vb[numpy.maximum(matched, 0)], numpy.nan)
+        return a, series_1d._from_sorted(values, a.timeline, name=b.name)
+    
+    merged, from_b, index = _merge(ta, tb)
+    new = numpy.r_[True, merged[1:] != merged[:-1]] # First occurrence of each date
+    group = numpy.cumsum(new) - 1
+    n = int(group[-1]) + 1
+    dates = merged[new]
+    ia, ib = numpy.full(n, -1), numpy.full(n, -1)
+    ia[group[~from_b]], ib[group[from_b]] = index[~from_b], index[from_b]
+    if how == 'inner':
+        both = (ia >= 0) & (ib >= 0)
+        timeline = irregular_timeline(dates[both])
+        return (series_1d._from_sorted(va[ia[both]], timeline, name=a.name),
+                series_1d._from_sorted(vb[ib[both]], timeline, name=b.name))
+    timeline = irregular_timeline(dates)
+    return (series_1d._from_sorted(_take(va, ia), timeline, name=a.name),
+            series_1d._from_sorted(_take(vb, ib), timeline, name=b.name))
+
+def _merge(t1, t2):
+    """Internal function, merge two sorted timelines. Return the merged dates, a mask
+    of the dates coming from `t2`, and their index in their own timeline."""
+    merged = numpy.concatenate((t1, t2))
+    order = numpy.argsort(merged, kind='stable')
+    from_second = order >= len(t1)
+    return merged[order], from_second, numpy.where(from_second, order - len(t1), order)
+
+def _take(values, indices):
+    """Internal function, values at `indices`, NaN where the index is -1"""
+    return numpy.where(indices >= 0, values[numpy.maximum(indices, 0)].astype(float), numpy.nan)
+
+def _timeline_array(serie):
+    """Internal function, the timeline of a serie as a numeric or datetime64[us] array"""
+    t = as_timeline(serie.timeline).to_array()
+    return t.astype('datetime64[us]') if t.dtype.kind == 'M' else t
+
+def _as_float(t):
+    """Internal function, dates (datetime64) or numbers as floats"""
+    return t.astype('int64').astype(float) if t.dtype.kind == 'M' else t.astype(float)
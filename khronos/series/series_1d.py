@@ -1,10 +1,13 @@
 from __future__ import absolute_import
 
-from ..utils.catch import catch_array, catch_split
-from ..utils.time_utils import generate_timeline
-from ..utils.visual import plot_ts
+from ..utils.catch import catch_array, catch_split, catch_walk_forward
+import numbers
+import numpy
+from numpy.lib.mixins import NDArrayOperatorsMixin
+from ..utils.time_utils import generate_timeline, as_timeline, regular_timeline
+from ..utils.instrumentation import instrumented
 
-class series_1d:
+class series_1d(NDArrayOperatorsMixin):
     """Data structure for evenly spaced one dimentional time series
     
     Take an array as an input. Optionnaly take arguments to define the dates of
@@ -17,12 +20,18 @@ class series_1d:
     
     # Arguments:
         values: Numpy Array, the values of the time serie.
-        timeline: Array or list, the dates of observation of the values, must be
-            the same length as `values`.
+        timeline: Array, list or timeline object (regular_timeline, irregular_timeline),
+            the dates of observation of the values, must be the same length as `values`.
         start_date: A date object, the date of the first observation.
         end_date: A date object the date of the last observation.
         by: a time_delta, the periode between each sampling.
+    
+    Series support the numpy array protocol: numpy functions, ufuncs and arithmetic
+    operators (`s + 1`, `s1 * s2`, `numpy.log(s)`, `s += 1`...) run directly on the values,
+    and element-wise results are series on the same timeline (never sorted again).
+    Binary operations between series require the same timeline.
     """
+    @instrumented('series_1d.__init__')
     def __init__(self, values,
                  timeline=None,
                  start_date=None,
@@ -38,9 +47,9 @@ class series_1d:
             #If a `timeline` was passed, we must sort the values in case `timeline` was not ordered
             if len(timeline)!=len(values): # Raise error if lengths are not consistent
                 raise ValueError("Values and timeline should be of the same length")
-            #Sort the values and unzip (convert to list to pass futur tests)
-            a, b = zip(*sorted(zip(timeline, self.values)))
-            self.timeline, self.values = list(a), catch_array(list(b))
+            self.timeline = as_timeline(timeline)
+            if not self.timeline.is_sorted(): # O(N) check, sorted timelines are kept as they are
+                self.timeline, self.values = _sort_by_timeline(self.timeline, self.values)
         
         elif any(e is not None for e in (start_date, end_date, by)):
             self.timeline, _ = generate_timeline(self.N, start_date, end_date, by)
@@ -48,6 +57,57 @@ class series_1d:
         else: #We must assume the default configuration
             self.timeline = range(self.N)
             
+    @classmethod
+    def _from_sorted(cls, values, timeline, name=None):
+        """Internal constructor, for values and a timeline known to be valid and sorted
+        (typically slices of an existing serie). Nothing is checked, copied or sorted."""
+        serie = cls.__new__(cls)
+        serie.values, serie.timeline = values, timeline
+        serie.N = len(values)
+        serie._splitted = False
+        serie.name = name
+        return serie
+            
+    def __len__(self):
+        return self.N
+    
+    # Comparisons are element-wise (as for arrays): a serie is mutable and unhashable,
+    # and its truth value is ambiguous (instead of being its length)
+    __hash__ = None
+    
+    def __bool__(self):
+        return bool(self.values) # Raise a ValueError for more than one value, as arrays do
+    
+    def __array__(self, dtype=None, copy=None):
+        """The values of the serie, for numpy functions"""
+        if dtype is None and not copy:
+            return self.values
+        return numpy.array(self.values, dtype=dtype, copy=True if copy else None)
+    
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        """Apply a ufunc to the values. Element-wise results are wrapped as a serie on the
+        same timeline, reductions are returned as they are. Outputs (`out=`) can be series,
+        in which case their values are modified in place."""
+        series = [x for x in inputs + kwargs.get('out', ()) if isinstance(x, series_1d)]
+        if not all(isinstance(x, (series_1d, numpy.ndarray, numbers.Number)) for x in inputs):
+            return NotImplemented
+        for other in series[1:]:
+            if not _same_timeline(series[0].timeline, other.timeline):
+                raise ValueError("Operations between series require the same timeline")
+        inputs = tuple(x.values if isinstance(x, series_1d) else x for x in inputs)
+        out = kwargs.get('out')
+        if out is not None:
+            kwargs['out'] = tuple(x.values if isinstance(x, series_1d) else x for x in out)
+        result = getattr(ufunc, method)(*inputs, **kwargs)
+        
+        if out is not None: # In place operation, return the outputs themselves
+            return out[0] if len(out) == 1 else out
+        names = set(s.name for s in series)
+        name = names.pop() if len(names) == 1 else None
+        wrap = lambda r: (series_1d._from_sorted(r, series[0].timeline, name=name)
+                          if method == '__call__' and isinstance(r, numpy.ndarray) and r.shape == (self.N,) else r)
+        return tuple(wrap(r) for r in result) if isinstance(result, tuple) else wrap(result)
+        
     def train_test_split(self, train=None, test=None, val=0):
         """Split the time serie into a training and a testing sets.
         
@@ -66,14 +126,41 @@ class series_1d:
             self._last_val_index = self._last_train_index + int(round(self.N * val))
         self._splitted = True
         
+    def walk_forward_split(self, train_size, test_size, step=None, window='expanding'):
+        """Lazily yield (train, test) folds for rolling-origin backtests.
+        The folds are series_1d views sharing the values and timeline of the serie,
+        so the memory used does not depend on the number of folds.
+        
+        #Arguments:
+            train_size: int or float, the number (or proportion) of points of the first
+                training set (of every training set if `window` is 'sliding')
+            test_size: int or float, the number (or proportion) of points of each testing set
+            step: int or float, the number (or proportion) of points between two folds
+                (default is `test_size`)
+            window: string, 'expanding' (the training sets all start at the beginning
+                of the serie) or 'sliding' (the training sets have a fixed size)
+        """
+        # The arguments are checked at the call, the folds are generated lazily
+        train_size, test_size, step = catch_walk_forward(self.N, train_size, test_size, step, window)
+        return self._walk_forward(train_size, test_size, step, window == 'sliding')
+    
+    def _walk_forward(self, train_size, test_size, step, sliding):
+        """Internal generator of the folds of walk_forward_split (checked arguments)"""
+        for indx_train in range(train_size, self.N - test_size + 1, step):
+            indx_start = indx_train - train_size if sliding else 0
+            yield (series_1d._from_sorted(self.values[indx_start:indx_train],
+                                          self.timeline[indx_start:indx_train]),
+                   series_1d._from_sorted(self.values[indx_train:indx_train+test_size],
+                                          self.timeline[indx_train:indx_train+test_size]))
+        
     def get_train(self):
         """Return the training part of the serie. Will fail if the serie is not splitted"""
         try:
             indx_train = self._last_train_index
         except:
             raise ValueError("Serie is not splitted. Call train_test_split to split it.")
-        return series_1d(self.values[:indx_train],
-                         self.timeline[:indx_train])
+        return series_1d._from_sorted(self.values[:indx_train],
+                                      self.timeline[:indx_train])
     
     def get_val(self,include_last=False):
         """Return the validation part of the serie. Will fail if the serie is not splitted
@@ -84,8 +171,8 @@ class series_1d:
             indx_val = self._last_val_index
         except:
             raise ValueError("Serie is not splitted into a validation set. Call train_test_split to split it.")
-        return series_1d(self.values[indx_train-include_last:indx_val],
-                         self.timeline[indx_train-include_last:indx_val])
+        return series_1d._from_sorted(self.values[indx_train-include_last:indx_val],
+                                      self.timeline[indx_train-include_last:indx_val])
         
     def get_test(self,include_last=False):
         """Return the testing part of the serie. Will fail if the serie is not splitted
@@ -101,23 +188,50 @@ class series_1d:
             except:
                 raise ValueError("Serie is not splitted. Call train_test_split to split it.")
         if indx_val: #If a validation set was found, the test set start after it
-            return series_1d(self.values[indx_val-include_last:],
-                         self.timeline[indx_val-include_last:])
+            return series_1d._from_sorted(self.values[indx_val-include_last:],
+                                          self.timeline[indx_val-include_last:])
         else:
-            return series_1d(self.values[indx_train-include_last:],
-                         self.timeline[indx_train-include_last:])
+            return series_1d._from_sorted(self.values[indx_train-include_last:],
+                                          self.timeline[indx_train-include_last:])
             
 
+    def save(self, path):
+        """Save the serie to `path` in a binary format that can be memory-mapped
+        Just a call to save_series from series.storage (use open_series to load it)
+        """
+        from .storage import save_series
+        save_series(self, path)
+
     def plot(self,**kwargs):
         """Display the time serie (using pyplot)
         Just a call to the visualisation function from utils.visual
+        (accept its `style`, `max_points` and `method` arguments)
         """
+        from ..utils.visual import plot_ts # matplotlib is only imported when plotting
         if 'style' not in kwargs.keys():
-            style = 'classic'
-        else:
-            style = kwargs['style']
-        plot_ts(self,style)
-            
-        
-        
-            
+            kwargs['style'] = 'classic'
+        plot_ts(self,**kwargs)
+
+def _same_timeline(a, b):
+    """Internal function, True if two timelines have the same dates (O(N), without copy
+    for compact timelines)"""
+    if a is b:
+        return True
+    if len(a) != len(b):
+        return False
+    if isinstance(a, regular_timeline) and isinstance(b, regular_timeline):
+        return a.start == b.start and (a.step == b.step or a.n < 2)
+    if isinstance(a, range) and isinstance(b, range):
+        return a == b
+    return bool(numpy.array_equal(as_timeline(a).to_array(), as_timeline(b).to_array()))
+
+@instrumented('series_1d.sort')
+def _sort_by_timeline(timeline, values):
+    """Internal function, sort a timeline and its values (ties are ordered by value)"""
+    dates = timeline.to_array()
+    order = numpy.argsort(dates)
+    sorted_dates = dates[order]
+    if numpy.any(sorted_dates[1:] == sorted_dates[:-1]):
+        #Ties in the timeline are ordered by value (slower sort, only if needed)
+        order = numpy.lexsort((values, dates))
+    return timeline[order], values[order]
@@ -0,0 +1,165 @@
+from __future__ import absolute_import
+
+import numpy
+from ..utils.catch import catch_length, catch_split
+from ..utils.time_utils import generate_timeline, as_timeline
+from .series_1d import series_1d
+
+class series_panel:
+    """Data structure for several one dimentional time series sharing the same timeline
+    
+    The values are stored in a single 2D array of shape (n_series, N), one row per
+    serie. The timeline is stored only once, and the optionnal arguments are the same
+    as for series_1d.
+    
+    # Arguments:
+        values: 2D Numpy Array of shape (n_series, N), the values of the time series.
+        timeline: Array or list, the dates of observation of the values, must be
+            of length N.
+        start_date: A date object, the date of the first observation.
+        end_date: A date object the date of the last observation.
+        by: a time_delta, the periode between each sampling.
+        names: list of strings, the names of each serie
+    """
+    def __init__(self, values,
+                 timeline=None,
+                 start_date=None,
+                 end_date=None,
+                 by=None,
+                 name=None,
+                 names=None):
+        self.values = numpy.asarray(values)
+        if self.values.ndim != 2:
+            raise ValueError("Values should be a 2D array of shape (n_series, N), got {} dimension(s)".format(self.values.ndim))
+        self.N = len(catch_length(self.values[0]))
+        self._splitted = False
+        self.name = name
+        if names is not None and len(names) != len(self.values):
+            raise ValueError("There should be one name per serie")
+        self.names = None if names is None else list(names)
+        
+        if timeline is not None:
+            if len(timeline) != self.N:
+                raise ValueError("Values and timeline should be of the same length")
+            #Sort the columns in case `timeline` was not ordered
+            self.timeline = as_timeline(timeline)
+            if not self.timeline.is_sorted():
+                order = numpy.argsort(self.timeline.to_array(), kind='stable')
+                self.timeline, self.values = self.timeline[order], self.values[:, order]
+        
+        elif any(e is not None for e in (start_date, end_date, by)):
+            self.timeline, _ = generate_timeline(self.N, start_date, end_date, by)
+            
+        else: #We must assume the default configuration
+            self.timeline = range(self.N)
+    
+    @classmethod
+    def _from_sorted(cls, values, timeline, name=None, names=None):
+        """Internal constructor, for values and a timeline known to be valid and sorted
+        (typically slices of an existing panel). Nothing is checked, copied or sorted."""
+        panel = cls.__new__(cls)
+        panel.values, panel.timeline = values, timeline
+        panel.N = values.shape[1]
+        panel._splitted = False
+        panel.name, panel.names = name, names
+        return panel
+    
+    @classmethod
+    def from_series(cls, series, names=None, name=None):
+        """Build a panel from a list of series_1d objects with the same timeline.
+        The values are copied into a single 2D array.
+        #Arguments:
+            series: list of series_1d objects
+            names: list of strings, the names of the series (default is their names)
+        """
+        if not series:
+            raise ValueError("At least one serie is needed")
+        timeline = as_timeline(series[0].timeline)
+        dates = timeline.to_array()
+        for s in series[1:]:
+            if len(s.timeline) != len(dates) or not numpy.array_equal(as_timeline(s.timeline).to_array(), dates):
+                raise ValueError("All the series should have the same timeline")
+        if names is None and any(s.name is not None for s in series):
+            names = [s.name for s in series]
+        return cls._from_sorted(numpy.array([s.values for s in series]), series[0].timeline,
+                                name=name, names=names)
+    
+    def to_series(self):
+        """Return the series of the panel as a list of series_1d objects (views of the panel)"""
+        return [self[i] for i in range(len(self))]
+    
+    def __len__(self):
+        """Number of series in the panel"""
+        return self.values.shape[0]
+    
+    def __getitem__(self, i):
+        """Return the i-th serie of the panel (or the serie named `i`) as a series_1d
+        object, viewing the values of the panel"""
+        i = self._index(i)
+        name = self.names[i] if self.names is not None else self.name
+        return series_1d._from_sorted(self.values[i], self.timeline, name=name)
+    
+    def select(self, columns):
+        """Return a panel with some of the series, given as a slice, or a list of
+        indices or names. Slices (and lists of consecutive series) are views of the
+        values of the panel, other selections are copies."""
+        if isinstance(columns, slice):
+            rows = columns
+            indices = range(len(self))[columns]
+        else:
+            indices = [self._index(c) for c in columns]
+            consecutive = len(indices) > 0 and indices == list(range(indices[0], indices[0] + len(indices)))
+            rows = slice(indices[0], indices[0] + len(indices)) if consecutive else indices
+        names = None if self.names is None else [self.names[i] for i in indices]
+        return series_panel._from_sorted(self.values[rows], self.timeline, name=self.name, names=names)
+    
+    def train_test_split(self, train=None, test=None, val=0):
+        """Split all the series of the panel into a training and a testing sets
+        (same arguments and split points as series_1d.train_test_split)."""
+        if self._splitted: raise ValueError("The panel is already splitted")
+        
+        if train is None and test is None:
+            train=0.8 # Assign a default value for train (0.8)
+        train, test, val = catch_split(train, test, val)
+        self._last_train_index = int(round(self.N * train))
+        if val != 0:
+            self._last_val_index = self._last_train_index + int(round(self.N * val))
+        self._splitted = True
+    
+    def get_train(self):
+        """Return the training part of the panel (a view). Will fail if the panel is not splitted"""
+        if not self._splitted:
+            raise ValueError("Panel is not splitted. Call train_test_split to split it.")
+        return self._time_slice(0, self._last_train_index)
+    
+    def get_val(self, include_last=False):
+        """Return the validation part of the panel (a view). Will fail if the panel is not splitted
+        #Arguments:
+            include_last: bolean, if True, the last point of the training set is included"""
+        if not hasattr(self, '_last_val_index'):
+            raise ValueError("Panel is not splitted into a validation set. Call train_test_split to split it.")
+        return self._time_slice(self._last_train_index - include_last, self._last_val_index)
+    
+    def get_test(self, include_last=False):
+        """Return the testing part of the panel (a view). Will fail if the panel is not splitted
+        #Arguments:
+            include_last: bolean, if True, the last point of the previous set (train of val) is included"""
+        if not self._splitted:
+            raise ValueError("Panel is not splitted. Call train_test_split to split it.")
+        start = getattr(self, '_last_val_index', self._last_train_index)
+        return self._time_slice(start - include_last, self.N)
+    
+    def _time_slice(self, start, end):
+        """Internal function, view of the panel between two indices of the timeline"""
+        return series_panel._from_sorted(self.values[:, start:end], self.timeline[start:end],
+                                         name=self.name, names=self.names)
+    
+    def _index(self, i):
+        """Internal function, index of a serie given by its index or name"""
+        if isinstance(i, str):
+            if self.names is None or i not in self.names:
+                raise KeyError("No serie named {}".format(i))
+            return self.names.index(i)
+        if not -len(self) <= i < len(self):
+            raise IndexError("Serie index out of range")
+        return int(i) % len(self)
@@ -0,0 +1,133 @@
+from __future__ import absolute_import
+
+import datetime
+import numpy
+from ..utils.time_utils import irregular_timeline
+from .series_1d import series_1d
+
+class series_stream:
+    """Append-only time serie, for live feeds receiving one observation at a time.
+    
+    The values and dates are stored in preallocated buffers, so appending is O(1)
+    (amortized). If `max_length` is given, only the last `max_length` observations are
+    kept, in a ring buffer written twice (at i and i + max_length) so that any window
+    of the latest observations is a contiguous view of the buffer.
+    
+    # Arguments:
+        max_length: int, the maximum number of observations kept (unbounded if None)
+        capacity: int, the initial size of the buffer of an unbounded stream
+        dtype: the numpy dtype of the values
+        name: string, the name of the serie
+    """
+    def __init__(self, max_length=None, capacity=1024, dtype=float, name=None):
+        if max_length is not None and max_length < 2:
+            raise ValueError("'max_length' should be at least 2, got {}".format(max_length))
+        self.max_length = max_length
+        self.name = name
+        self._size = 2*max_length if max_length is not None else max(int(capacity), 2)
+        self._values = numpy.empty(self._size, dtype=dtype)
+        self._dates = None # Allocated at the first append, once the type of dates is known
+        self._write = 0 # Position of the next write (modulo max_length if bounded)
+        self._count = 0 # Number of observations kept
+        self.n_seen = 0 # Number of observations appended since the creation
+    
+    def __len__(self):
+        return self._count
+    
+    def append(self, value, date=None):
+        """Append one observation. `date` must not be before the last date, and is the
+        number of observations seen so far if not given."""
+        self.extend(numpy.array([value]), None if date is None else [date])
+    
+    def extend(self, values, dates=None):
+        """Append several observations at once (vectorized).
+        #Arguments:
+            values: array or list, the new values
+            dates: array or list, the dates of the new values (must be sorted), or None
+                to use the number of observations seen so far
+        """
+        values = numpy.asarray(values, dtype=self._values.dtype)
+        k = len(values)
+        if dates is None:
+            dates = self.n_seen + numpy.arange(k)
+        dates = self._as_dates(dates)
+        if len(dates) != k:
+            raise ValueError("Values and dates should be of the same length")
+        if k == 0:
+            return
+        if numpy.any(dates[1:] < dates[:-1]) or (self._count and dates[0] < self._last_date()):
+            raise ValueError("Dates should be appended in increasing order")
+        # Checked, the stream can be modified
+        if self._dates is None:
+            self._dates = numpy.empty(self._size, dtype=dates.dtype if dates.dtype.kind == 'M' else float)
+        self.n_seen += k
+        
+        if self.max_length is None:
+            if self._count + k > self._size: # Double the buffers (amortized O(1) append)
+                while self._count + k > self._size:
+                    self._size *= 2
+                self._values = _grow(self._values, self._size)
+                self._dates = _grow(self._dates, self._size)
+            self._values[self._count:self._count+k] = values
+            self._dates[self._count:self._count+k] = dates
+            self._count += k
+            self._write = self._count
+        else:
+            L = self.max_length
+            if k >= L: # Only the last observations are kept
+                values, dates, k = values[-L:], dates[-L:], L
+            positions = (self._write + numpy.arange(k)) % L
+            for buffer, new in ((self._values, values), (self._dates, dates)):
+                buffer[positions] = new
+                buffer[positions + L] = new
+            self._write = (self._write + k) % L
+            self._count = min(self._count + k, L)
+    
+    def window(self, n=None):
+        """Return the last `n` observations (all the observations kept if None) as a
+        series_1d object. The values and timeline are views of the buffers, without copy:
+        they are only valid until the next append, copy them if needed."""
+        if n is None:
+            n = self._count
+        if n > self._count or n < 1:
+            raise ValueError("Can't return a window of {} observations, {} are available".format(n, self._count))
+        start = self._write - n
+        if start < 0: # Only happens for a full ring buffer, read the second copy
+            start += self.max_length
+        end = start + n
+        return series_1d._from_sorted(self._values[start:end],
+                                      irregular_timeline(self._dates[start:end]),
+                                      name=self.name)
+    
+    @property
+    def values(self):
+        """View of all the values kept"""
+        return self.window().values
+    
+    @property
+    def timeline(self):
+        """View of the timeline of all the values kept"""
+        return self.window().timeline
+    
+    def _last_date(self):
+        """Internal function, return the date of the last observation"""
+        return self._dates[(self._write - 1) % self.max_length if self.max_length else self._count - 1]
+    
+    def _as_dates(self, dates):
+        """Internal function, convert the dates and check they are of the kind of the stream"""
+        dates = numpy.asarray(dates)
+        if dates.dtype == object and all(isinstance(d, (datetime.date, numpy.datetime64)) for d in dates.flat):
+            dates = dates.astype('datetime64[us]')
+        elif dates.dtype.kind == 'M':
+            dates = dates.astype('datetime64[us]')
+        if dates.dtype.kind not in 'iufM':
+            raise ValueError("Dates should be numbers or dates, got {}".format(dates.dtype))
+        if self._dates is not None and (dates.dtype.kind == 'M') != (self._dates.dtype.kind == 'M'):
+            raise ValueError("Can't mix dated and numeric dates in the same stream")
+        return dates
+
+def _grow(buffer, size):
+    """Internal function, return a copy of `buffer` with a larger size"""
+    new = numpy.empty(size, dtype=buffer.dtype)
+    new[:len(buffer)] = buffer
+    return new
@@ -0,0 +1,144 @@
+"""Binary on-disk format for series_1d objects.
+
+A file is made of a magic string, the length of a JSON header, the header itself
+and then the raw values (and the raw dates for irregular timelines), each aligned
+on `_ALIGN` bytes so they can be memory-mapped. Regular timelines are stored in
+the header only, as (start, step, n).
+"""
+from __future__ import absolute_import
+
+import json
+import numpy
+from ..utils.time_utils import as_timeline, regular_timeline, irregular_timeline
+from .series_1d import series_1d
+
+_MAGIC = b'KHRONOS1'
+_ALIGN = 64
+
+def save_series(serie, path):
+    """Save a series_1d object to `path`, in the Khronos binary format.
+    
+    #Arguments:
+        serie: series_1d object, the serie to save
+        path: string, the file to write
+    """
+    values = numpy.ascontiguousarray(serie.values)
+    timeline = as_timeline(serie.timeline)
+    header = {'dtype': values.dtype.str, 'n': len(values), 'name': serie.name}
+    if isinstance(timeline, regular_timeline):
+        header['timeline'] = _regular_header(timeline)
+        dates = None
+    else:
+        dates = numpy.ascontiguousarray(timeline.to_array())
+        if dates.dtype.hasobject:
+            raise ValueError("Timelines of Python objects ({}) can't be stored".format(type(dates[0]).__name__))
+        header['timeline'] = {'kind': 'irregular', 'dtype': dates.dtype.str}
+    
+    values_offset = _aligned(len(_MAGIC) + 8 + len(json.dumps(header).encode('utf-8')) + 128) #Room for the offsets
+    header['values_offset'] = values_offset
+    if dates is not None:
+        header['timeline']['offset'] = _aligned(values_offset + values.nbytes)
+    encoded = json.dumps(header).encode('utf-8')
+    
+    with open(path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(numpy.array(len(encoded), dtype='<u8').tobytes())
+        f.write(encoded)
+        f.write(b'\0' * (values_offset - f.tell()))
+        values.tofile(f)
+        if dates is not None:
+            f.write(b'\0' * (header['timeline']['offset'] - f.tell()))
+            dates.tofile(f)
+
+def save_chunks(chunks, path):
+    """Save a serie given as consecutive chunks (series_1d objects, for example from
+    generator.ARMA_chunks) to `path`, in the Khronos binary format. The chunks are written
+    one at a time, so the memory used does not depend on the length of the serie. Their
+    timelines must be regular and follow each other. The file can then be memory-mapped
+    with `open_series`.
+    
+    #Arguments:
+        chunks: iterable of series_1d objects, the consecutive parts of the serie
+        path: string, the file to write
+    
+    Return the number of values written.
+    """
+    header, n = None, 0
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            values = numpy.ascontiguousarray(chunk.values)
+            timeline = as_timeline(chunk.timeline)
+            if not isinstance(timeline, regular_timeline):
+                raise ValueError("Only chunks with regular timelines can be saved by chunks")
+            if header is None:
+                first = timeline
+                header = {'dtype': values.dtype.str, 'n': 0, 'name': chunk.name,
+                          'timeline': _regular_header(timeline)}
+                # The header is written at the end, when the length is known
+                values_offset = _aligned(len(_MAGIC) + 8 + len(json.dumps(header).encode('utf-8')) + 128)
+                f.seek(values_offset)
+            elif values.dtype.str != header['dtype']:
+                raise ValueError("All the chunks should have the same dtype")
+            elif len(timeline) and (timeline.start != first.start + n*first.step
+                                    or (len(timeline) > 1 and timeline.step != first.step)):
+                raise ValueError("The timelines of the chunks should follow each other")
+            values.tofile(f)
+            n += len(values)
+        if header is None:
+            raise ValueError("No chunk to save")
+        header['n'] = header['timeline']['n'] = n
+        header['values_offset'] = values_offset
+        encoded = json.dumps(header).encode('utf-8')
+        f.seek(0)
+        f.write(_MAGIC)
+        f.write(numpy.array(len(encoded), dtype='<u8').tobytes())
+        f.write(encoded)
+        f.write(b'\0' * (values_offset - f.tell()))
+    return n
+
+def open_series(path, mode='r'):
+    """Open a series_1d object saved with `save_series`. The values (and the dates of an
+    irregular timeline) are memory-mapped: only the parts of the file that are accessed
+    (by slicing, splitting...) are read from the disk.
+    
+    #Arguments:
+        path: string, the file to open
+        mode: string, the numpy.memmap mode ('r' for read-only, 'r+' to modify the values
+            in place, 'c' for copy-on-write)
+    """
+    if mode not in ('r', 'r+', 'c'):
+        raise ValueError("Mode should be 'r', 'r+' or 'c', not {}".format(mode))
+    with open(path, 'rb') as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError("{} is not a Khronos series file".format(path))
+        header_length = int(numpy.frombuffer(f.read(8), dtype='<u8')[0])
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    
+    values = numpy.memmap(path, dtype=numpy.dtype(header['dtype']), mode=mode,
+                          offset=header['values_offset'], shape=(header['n'],))
+    tl = header['timeline']
+    if tl['kind'] == 'regular':
+        if tl['dated']:
+            timeline = regular_timeline(numpy.datetime64(tl['start'], 'us'),
+                                        numpy.timedelta64(tl['step'], 'us'), tl['n'])
+        else:
+            timeline = regular_timeline(tl['start'], tl['step'], tl['n'])
+    else:
+        timeline = irregular_timeline(numpy.memmap(path, dtype=numpy.dtype(tl['dtype']), mode='r',
+                                                   offset=tl['offset'], shape=(header['n'],)))
+    return series_1d._from_sorted(values, timeline, name=header['name'])
+
+def _regular_header(timeline):
+    """Internal function, the header of a regular timeline"""
+    dated = isinstance(timeline.start, numpy.datetime64)
+    return {'kind': 'regular', 'dated': dated, 'n': timeline.n,
+            'start': int(timeline.start.astype('int64')) if dated else _py(timeline.start),
+            'step': int(timeline.step.astype('int64')) if dated else _py(timeline.step)}
+
+def _aligned(offset):
+    """Internal function, round `offset` up to a multiple of _ALIGN"""
+    return -(-offset // _ALIGN) * _ALIGN
+
+def _py(x):
+    """Internal function, convert numpy scalars to JSON serializable numbers"""
+    return x.item() if isinstance(x, numpy.generic) else x
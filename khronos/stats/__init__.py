@@ -0,0 +1,3 @@
+from .rolling import rolling_mean, rolling_var, rolling_min, rolling_max, rolling_autocov, ewma
+from .online import running_moments, rolling_moments, running_ewma, running_autocov
+from .correlation import acovf, acf, pacf, ccf, levinson_durbin
@@ -0,0 +1,110 @@
+"""Autocorrelation analysis: ACF, PACF and cross-correlation.
+
+The (cross-)covariances are computed for all the lags at once with a FFT, in
+O(N log N), and the PACF is derived from the ACF with the Levinson-Durbin recursion.
+All the functions work along the last axis, so a 2D array is a batch of series.
+"""
+from __future__ import absolute_import
+
+import numpy
+from .rolling import _as_values
+
+def acovf(x, nlags=None, demean=True):
+    """Autocovariance function, for lags 0 to `nlags` (biased estimator, divisor N).
+    #Arguments:
+        x: array (1D or 2D, computed along the last axis) or series_1d object
+        nlags: int, the last lag (default is N - 1)
+        demean: boolean, if True the mean of the serie is substracted first
+    """
+    x = _prepare(x, demean)
+    nlags = _check_lags(x, nlags)
+    N = x.shape[-1]
+    n_fft = _fft_length(N)
+    f = numpy.fft.rfft(x, n=n_fft, axis=-1)
+    return numpy.fft.irfft(f * numpy.conj(f), n=n_fft, axis=-1)[..., :nlags+1] / N
+
+def acf(x, nlags=None, demean=True):
+    """Autocorrelation function, for lags 0 to `nlags`.
+    #Arguments:
+        x: array (1D or 2D, computed along the last axis) or series_1d object
+        nlags: int, the last lag (default is N - 1)
+        demean: boolean, if True the mean of the serie is substracted first
+    """
+    acov = acovf(x, nlags, demean)
+    return acov / acov[..., :1]
+
+def pacf(x, nlags=None, demean=True):
+    """Partial autocorrelation function, for lags 0 to `nlags` (Yule-Walker estimates,
+    through the Levinson-Durbin recursion on the ACF).
+    #Arguments:
+        x: array (1D or 2D, computed along the last axis) or series_1d object
+        nlags: int, the last lag (default is min(N - 1, 40))
+        demean: boolean, if True the mean of the serie is substracted first
+    """
+    if nlags is None:
+        nlags = min(_as_values(x).shape[-1] - 1, 40)
+    _, partial, _ = levinson_durbin(acovf(x, nlags, demean), nlags)
+    return partial
+
+def ccf(x, y, nlags=None, demean=True):
+    """Cross-correlation function: correlation between x[t+k] and y[t], for k from 0 to `nlags`.
+    #Arguments:
+        x, y: arrays (1D or 2D, computed along the last axis) or series_1d objects,
+            of the same length
+        nlags: int, the last lag (default is N - 1)
+        demean: boolean, if True the means of the series are substracted first
+    """
+    x, y = _prepare(x, demean), _prepare(y, demean)
+    if x.shape[-1] != y.shape[-1]:
+        raise ValueError("x and y should be of the same length")
+    nlags = _check_lags(x, nlags)
+    N = x.shape[-1]
+    n_fft = _fft_length(N)
+    fx, fy = numpy.fft.rfft(x, n=n_fft, axis=-1), numpy.fft.rfft(y, n=n_fft, axis=-1)
+    ccov = numpy.fft.irfft(fx * numpy.conj(fy), n=n_fft, axis=-1)[..., :nlags+1] / N
+    scale = numpy.sqrt(numpy.mean(x*x, axis=-1, keepdims=True) * numpy.mean(y*y, axis=-1, keepdims=True))
+    return ccov / scale
+
+def levinson_durbin(acov, order):
+    """Solve the Yule-Walker equations with the Levinson-Durbin recursion, in O(order^2).
+    #Arguments:
+        acov: array (1D or 2D, along the last axis), the autocovariances from lag 0
+            to at least `order`
+        order: int, the order of the autoregressive model
+    
+    Return the AR coefficients (shape (..., order)), the partial autocorrelations
+    (shape (..., order+1), starting with 1 for lag 0) and the innovation variance.
+    """
+    r = numpy.asarray(acov, dtype=float)
+    if r.shape[-1] < order + 1:
+        raise ValueError("Need the autocovariances up to lag {}".format(order))
+    phi = numpy.zeros(r.shape[:-1] + (order,))
+    partial = numpy.ones(r.shape[:-1] + (order + 1,))
+    sigma2 = r[..., 0].copy()
+    for k in range(1, order + 1):
+        # Reflection coefficient of order k
+        kappa = (r[..., k] - numpy.sum(phi[..., :k-1] * r[..., k-1:0:-1], axis=-1)) / sigma2
+        if k > 1:
+            phi[..., :k-1] -= kappa[..., None] * phi[..., k-2::-1]
+        phi[..., k-1] = kappa
+        partial[..., k] = kappa
+        sigma2 = sigma2 * (1 - kappa*kappa)
+    return phi, partial, sigma2
+
+def _prepare(x, demean):
+    """Internal function, return the values as a float array (centered if asked)"""
+    x = _as_values(x).astype(float)
+    return x - x.mean(axis=-1, keepdims=True) if demean else x
+
+def _check_lags(x, nlags):
+    """Internal function, check the number of lags and return its default value if needed"""
+    N = x.shape[-1]
+    if nlags is None:
+        return N - 1
+    if not 0 <= nlags < N:
+        raise ValueError("'nlags' should be between 0 and N - 1, got {}".format(nlags))
+    return nlags
+
+def _fft_length(N):
+    """Internal function, the smallest power of two large enough to avoid circular correlation"""
+    return 1 << int(2*N - 2).bit_length()
@@ -0,0 +1,188 @@
+"""Online accumulators, updated in O(1) per observation.
+
+They can be fed one value at a time (`update`), or with a series_1d, a series_stream
+or an array (`feed`). The sums are compensated (Kahan) or updated with Welford's
+recurrences, so they stay accurate on very long series.
+"""
+from __future__ import absolute_import
+
+import collections
+import numpy
+from .rolling import ewma, _as_values
+
+class running_moments:
+    """Expanding mean, variance, minimum and maximum (Welford's algorithm).
+    Batches given to `feed` are merged with Chan's parallel formula."""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min, self.max = numpy.inf, -numpy.inf
+    
+    def update(self, x):
+        """Add one observation"""
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+        self.min, self.max = min(self.min, x), max(self.max, x)
+    
+    def feed(self, source):
+        """Add all the values of a series_1d, series_stream or array (vectorized)"""
+        values = _as_values(source).astype(float).ravel()
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = numpy.sum((values - mean)**2)
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta**2 * self.n * n / total
+        self.n = total
+        self.min, self.max = min(self.min, values.min()), max(self.max, values.max())
+    
+    def variance(self, ddof=0):
+        """Variance of the observations (divisor `n - ddof`)"""
+        return self._m2 / (self.n - ddof) if self.n > ddof else numpy.nan
+
+class rolling_moments:
+    """Mean, variance, minimum and maximum of the last `window` observations.
+    The moments use Welford's update for a value replacing another one, and the extrema
+    monotonic queues (amortized O(1)).
+    
+    # Arguments:
+        window: int, the number of observations of the window
+    """
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("'window' should be at least 1, got {}".format(window))
+        self.window = window
+        self._buffer = collections.deque()
+        self._min_queue = collections.deque() # (index, value), increasing values
+        self._max_queue = collections.deque() # (index, value), decreasing values
+        self._index = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+    
+    @property
+    def n(self):
+        return len(self._buffer)
+    
+    def update(self, x):
+        """Add one observation, and remove the oldest one if the window is full"""
+        if len(self._buffer) == self.window:
+            old = self._buffer.popleft()
+            mean = self.mean + (x - old) / self.window
+            self._m2 += (x - old) * (x - mean + old - self.mean)
+            self.mean = mean
+        else:
+            delta = x - self.mean
+            self.mean += delta / (len(self._buffer) + 1)
+            self._m2 += delta * (x - self.mean)
+        self._buffer.append(x)
+        
+        for queue, better in ((self._min_queue, lambda a, b: a <= b), (self._max_queue, lambda a, b: a >= b)):
+            while queue and better(x, queue[-1][1]):
+                queue.pop()
+            queue.append((self._index, x))
+            if queue[0][0] <= self._index - self.window:
+                queue.popleft()
+        self._index += 1
+    
+    def feed(self, source):
+        """Add all the values of a series_1d, series_stream or array"""
+        for x in _as_values(source).ravel().tolist():
+            self.update(x)
+    
+    def variance(self, ddof=0):
+        """Variance of the observations of the window (divisor `n - ddof`)"""
+        return max(self._m2, 0.0) / (self.n - ddof) if self.n > ddof else numpy.nan
+    
+    @property
+    def min(self):
+        return self._min_queue[0][1] if self._min_queue else numpy.nan
+    
+    @property
+    def max(self):
+        return self._max_queue[0][1] if self._max_queue else numpy.nan
+
+class running_ewma:
+    """Exponentially weighted moving average: y = x for the first observation,
+    then y = (1-alpha)*y + alpha*x.
+    
+    # Arguments:
+        alpha: float between 0 and 1, the smoothing factor
+    """
+    def __init__(self, alpha):
+        if not 0 < alpha <= 1:
+            raise ValueError("'alpha' should be a float between 0 and 1")
+        self.alpha = alpha
+        self.value = None
+    
+    def update(self, x):
+        """Add one observation"""
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+    
+    def feed(self, source):
+        """Add all the values of a series_1d, series_stream or array (vectorized)"""
+        values = _as_values(source).astype(float).ravel()
+        if self.value is not None:
+            values = numpy.append(self.value, values)
+        if len(values):
+            self.value = ewma(values, self.alpha)[-1]
+
+class running_autocov:
+    """Expanding lag-`lag` autocovariance: 1/n * sum((x[t] - m)*(x[t-lag] - m)) over the
+    pairs of observations, m being the mean of all the observations. The data is shifted
+    by the first observation, and the sums are compensated (Kahan).
+    
+    # Arguments:
+        lag: int, the lag of the autocovariance
+    """
+    def __init__(self, lag=1):
+        if lag < 0:
+            raise ValueError("'lag' should be positive, got {}".format(lag))
+        self.lag = lag
+        self.n = 0
+        self._shift = None
+        self._last = collections.deque(maxlen=lag + 1) # The last shifted observations
+        self._sum, self._lead, self._lagged, self._pairs = (_kahan_sum() for _ in range(4))
+    
+    def update(self, x):
+        """Add one observation"""
+        if self._shift is None:
+            self._shift = x
+        y = x - self._shift
+        self.n += 1
+        self._sum.add(y)
+        self._last.append(y)
+        if len(self._last) == self.lag + 1:
+            self._lead.add(y)
+            self._lagged.add(self._last[0])
+            self._pairs.add(y * self._last[0])
+    
+    def feed(self, source):
+        """Add all the values of a series_1d, series_stream or array"""
+        for x in _as_values(source).ravel().tolist():
+            self.update(x)
+    
+    @property
+    def value(self):
+        if self.n <= self.lag:
+            return numpy.nan
+        m = self._sum.value / self.n
+        return (self._pairs.value - m*(self._lead.value + self._lagged.value)
+                + (self.n - self.lag)*m*m) / self.n
+
+class _kahan_sum:
+    """Internal class, compensated sum"""
+    def __init__(self):
+        self.value = 0.0
+        self._compensation = 0.0
+    
+    def add(self, x):
+        y = x - self._compensation
+        total = self.value + y
+        self._compensation = (total - self.value) - y
+        self.value = total
@@ -0,0 +1,148 @@
+"""Vectorized O(N) rolling statistics, along the last axis of an array (or on a serie).
+
+The rolling sums are computed by chunks of a few windows (all the chunks at once), on data
+shifted by the mean of the chunk, so the rounding errors depend on the variations of the
+serie at the scale of the window, and not on its level, trend or length.
+The output has the same length as the input, and starts with `window - 1` NaN.
+"""
+from __future__ import absolute_import
+
+import numpy
+from ..series.filters import arma_filter
+
+_CHUNK = 8 # Minimum number of windows of a chunk
+
+def rolling_mean(x, window):
+    """Rolling mean over `window` points.
+    #Arguments:
+        x: array (1D or 2D, computed along the last axis) or series_1d object
+        window: int, the number of points of each window
+    """
+    out = _output(x, window)
+    y, shift = _chunks(x, window)
+    cs = _cumsum(y)
+    return _assemble(out, (cs[..., window:] - cs[..., :-window]) / window + shift, window)
+
+def rolling_var(x, window, ddof=0):
+    """Rolling variance over `window` points.
+    #Arguments:
+        x: array (1D or 2D, computed along the last axis) or series_1d object
+        window: int, the number of points of each window
+        ddof: int, delta degrees of freedom (the divisor is `window - ddof`)
+    """
+    if window - ddof < 1:
+        raise ValueError("'window' should be larger than 'ddof'")
+    out = _output(x, window)
+    y, _ = _chunks(x, window)
+    cs, cs2 = _cumsum(y), _cumsum(y*y)
+    s1 = cs[..., window:] - cs[..., :-window]
+    s2 = cs2[..., window:] - cs2[..., :-window]
+    return _assemble(out, numpy.maximum(s2 - s1*s1/window, 0) / (window - ddof), window)
+
+def rolling_autocov(x, window, lag=1):
+    """Rolling lag-`lag` autocovariance over `window` points:
+    1/window * sum((x[t] - m)*(x[t-lag] - m)) over the pairs of the window, m being the
+    mean of the window.
+    #Arguments:
+        x: array (1D or 2D, computed along the last axis) or series_1d object
+        window: int, the number of points of each window
+        lag: int, the lag of the autocovariance
+    """
+    if not 0 <= lag < window:
+        raise ValueError("'lag' should be between 0 and 'window' - 1")
+    out = _output(x, window)
+    y, _ = _chunks(x, window)
+    L = y.shape[-1]
+    z = numpy.zeros_like(y)
+    z[..., lag:] = y[..., lag:] * y[..., :L-lag]
+    cs, cz = _cumsum(y), _cumsum(z)
+    n = L + 1 - window
+    m = (cs[..., window:] - cs[..., :n]) / window
+    pairs = cz[..., window:] - cz[..., lag:lag+n]
+    lead = cs[..., window:] - cs[..., lag:lag+n] # Sum of x[t]
+    lagged = cs[..., window-lag:window-lag+n] - cs[..., :n] # Sum of x[t-lag]
+    return _assemble(out, (pairs - m*(lead + lagged) + (window - lag)*m*m) / window, window)
+
+def rolling_min(x, window):
+    """Rolling minimum over `window` points (van Herk/Gil-Werman algorithm).
+    #Arguments:
+        x: array (1D or 2D, computed along the last axis) or series_1d object
+        window: int, the number of points of each window
+    """
+    return _rolling_extremum(x, window, numpy.minimum, numpy.inf)
+
+def rolling_max(x, window):
+    """Rolling maximum over `window` points (van Herk/Gil-Werman algorithm).
+    #Arguments:
+        x: array (1D or 2D, computed along the last axis) or series_1d object
+        window: int, the number of points of each window
+    """
+    return _rolling_extremum(x, window, numpy.maximum, -numpy.inf)
+
+def ewma(x, alpha):
+    """Exponentially weighted moving average: y[0] = x[0], y[t] = (1-alpha)*y[t-1] + alpha*x[t]
+    #Arguments:
+        x: array (1D or 2D, computed along the last axis) or series_1d object
+        alpha: float between 0 and 1, the smoothing factor
+    """
+    if not 0 < alpha <= 1:
+        raise ValueError("'alpha' should be a float between 0 and 1")
+    x = _as_values(x).astype(float)
+    e = alpha * x
+    e[..., 0] = x[..., 0]
+    # This is an AR(1) recursion, solved by the linear filter of the generators
+    return arma_filter(e, [1 - alpha], [], start=1)
+
+def _as_values(x):
+    """Internal function, return the values of a serie (or of a stream) as an array"""
+    return numpy.asarray(getattr(x, 'values', x))
+
+def _output(x, window):
+    """Internal function, check the window and allocate the output"""
+    x = _as_values(x)
+    if not 1 <= window <= x.shape[-1]:
+        raise ValueError("'window' should be between 1 and the length of the serie, got {}".format(window))
+    return numpy.full(x.shape, numpy.nan)
+
+def _chunks(x, window):
+    """Internal function, the points needed to compute the windows, by chunks of C windows
+    (C = max(window, _CHUNK)): an array of shape (..., n_chunks, C + window - 1), each
+    chunk shifted by its mean (also returned). The end of the serie is padded with its
+    last value."""
+    x = _as_values(x)
+    N = x.shape[-1]
+    C = max(window, _CHUNK)
+    n_chunks = -(-(N - window + 1) // C)
+    pad = [(0, 0)] * (x.ndim - 1) + [(0, window - 1 + n_chunks*C - N)]
+    padded = numpy.pad(x.astype(float), pad, mode='edge')
+    # Overlapping chunks, as a strided view (the copy is made by the shift)
+    y = numpy.lib.stride_tricks.sliding_window_view(padded, C + window - 1, axis=-1)[..., ::C, :]
+    shift = y.mean(axis=-1, keepdims=True)
+    return y - shift, shift
+
+def _assemble(out, chunks, window):
+    """Internal function, write the statistics computed by chunks, of shape
+    (..., n_chunks, C), after the `window - 1` NaN of the output"""
+    N = out.shape[-1]
+    out[..., window-1:] = chunks.reshape(chunks.shape[:-2] + (-1,))[..., :N-window+1]
+    return out
+
+def _cumsum(y):
+    """Internal function, cumulative sum along the last axis starting with a 0"""
+    cs = numpy.zeros(y.shape[:-1] + (y.shape[-1] + 1,))
+    numpy.cumsum(y, axis=-1, out=cs[..., 1:])
+    return cs
+
+def _rolling_extremum(x, window, ufunc, identity):
+    """Internal function, rolling min or max with prefix and suffix extrema by blocks"""
+    out = _output(x, window)
+    x = _as_values(x)
+    N = x.shape[-1]
+    n_blocks = -(-N // window)
+    padded = numpy.full(x.shape[:-1] + (n_blocks*window,), identity)
+    padded[..., :N] = x
+    blocks = padded.reshape(x.shape[:-1] + (n_blocks, window))
+    prefix = ufunc.accumulate(blocks, axis=-1).reshape(padded.shape)
+    suffix = ufunc.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(padded.shape)
+    out[..., window-1:] = ufunc(suffix[..., :N-window+1], prefix[..., window-1:N])
+    return out
@@ -0,0 +1,2 @@
+from . import instrumentation
+from .instrumentation import profile, get_stats
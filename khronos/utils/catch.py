@@ -42,4 +42,25 @@ def catch_split(train=None, test=None, val=0):
     if test is None: 
         test = 1 - train - val
     
-    return train, test, val
\ No newline at end of file
+    return train, test, val
+
+def catch_walk_forward(N, train_size, test_size, step=None, window='expanding'):
+    """Check if the walk-forward split is valid. Return the sizes as number of points if so.
+    Sizes can be given as a number of points (int) or a proportion of the serie (float)."""
+    if window not in ('expanding', 'sliding'):
+        raise ValueError("'window' should be 'expanding' or 'sliding', got {}".format(window))
+    sizes = []
+    for name, size in (('train_size', train_size), ('test_size', test_size), ('step', step)):
+        if isinstance(size, float):
+            if size <= 0 or size > 1:
+                raise ValueError("'{}' should be a float between 0 and 1".format(name))
+            size = int(round(N * size))
+        if size is not None and size < 1:
+            raise ValueError("'{}' should be at least one point".format(name))
+        sizes.append(size)
+    train_size, test_size, step = sizes
+    if train_size + test_size > N:
+        raise ValueError("'train_size' plus 'test_size' are larger than the serie")
+    if step is None:
+        step = test_size
+    return train_size, test_size, step
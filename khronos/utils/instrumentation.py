@@ -0,0 +1,133 @@
+"""Opt-in instrumentation of the hot paths of Khronos.
+
+The instrumented functions (timeline generation, sorting in series_1d, date parsing,
+noise generation, ARMA filtering...) record their number of calls, cumulative time and,
+optionally, the peak memory they allocate (traced with tracemalloc). When disabled
+(the default), an instrumented function only checks one global flag.
+
+Example:
+    with instrumentation.profile(memory=True) as stats:
+        ARMA_generator(10**6, p=[0.5], q=[0.3], start_date='01/01/2000', by='1d')
+    stats['arma_filter']['time']
+
+Times are inclusive: the time of a function includes the time of the instrumented
+functions it calls.
+"""
+import contextlib
+import functools
+import time
+
+_ENABLED = False
+_MEMORY = False
+_HOOK = None
+_STARTED_TRACING = False
+_STATS = {}
+_PEAKS = [] # Peak memory of the instrumented calls in progress
+
+def instrumented(name):
+    """Decorator recording the calls of a function under `name` when instrumentation is enabled"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return function(*args, **kwargs)
+            return _record(name, function, args, kwargs)
+        return wrapper
+    return decorator
+
+def enable(memory=False, hook=None):
+    """Start recording the instrumented functions.
+    #Arguments:
+        memory: boolean, if True the peak memory allocated by each call (temporaries
+            included, above the memory in use before the call) is also recorded
+            (with tracemalloc, which slows down the allocations)
+        hook: function called after each instrumented call with the name, the time (s)
+            and the peak memory allocated (bytes, None if not recorded), for example to send
+            the numbers to a metrics system
+    """
+    global _ENABLED, _MEMORY, _HOOK, _STARTED_TRACING
+    if memory:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _STARTED_TRACING = True
+    _ENABLED, _MEMORY, _HOOK = True, memory, hook
+
+def disable():
+    """Stop recording (the statistics are kept until `reset`)"""
+    global _ENABLED, _MEMORY, _HOOK, _STARTED_TRACING
+    if _STARTED_TRACING:
+        import tracemalloc
+        tracemalloc.stop()
+        _STARTED_TRACING = False
+    _ENABLED, _MEMORY, _HOOK = False, False, None
+
+def is_enabled():
+    return _ENABLED
+
+def reset():
+    """Forget all the statistics recorded"""
+    _STATS.clear()
+
+def get_stats():
+    """Return the statistics recorded, as a dictionary {name: {'calls', 'time', 'bytes'}},
+    'bytes' being the sum of the peak memory allocated by the calls"""
+    return dict((name, dict(stats)) for name, stats in _STATS.items())
+
+@contextlib.contextmanager
+def profile(memory=False, hook=None):
+    """Context manager recording the instrumented functions called in its block.
+    Yield a dictionary, filled at the end of the block with the statistics of the block
+    only (same format as `get_stats`). See `enable` for the arguments."""
+    global _ENABLED, _MEMORY, _HOOK
+    previous = (_ENABLED, _MEMORY, _HOOK)
+    before = get_stats()
+    report = {}
+    started_tracing = False
+    if memory:
+        import tracemalloc
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+    _ENABLED, _MEMORY, _HOOK = True, memory or previous[1], hook or previous[2]
+    try:
+        yield report
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _ENABLED, _MEMORY, _HOOK = previous
+        for name, stats in get_stats().items():
+            old = before.get(name, {'calls': 0, 'time': 0.0, 'bytes': 0})
+            if stats['calls'] > old['calls']:
+                report[name] = dict((key, stats[key] - old[key]) for key in stats)
+
+def _record(name, function, args, kwargs):
+    """Internal function, call `function` and record its statistics"""
+    memory = _MEMORY
+    if memory:
+        import tracemalloc
+        memory_before, peak = tracemalloc.get_traced_memory()
+        # The peak of tracemalloc is reset for this call: the peak reached so far is kept
+        # for the enclosing instrumented calls
+        if _PEAKS:
+            _PEAKS[-1] = max(_PEAKS[-1], peak)
+        _PEAKS.append(memory_before)
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        allocated = None
+        if memory:
+            peak = max(_PEAKS.pop(), tracemalloc.get_traced_memory()[1])
+            if _PEAKS:
+                _PEAKS[-1] = max(_PEAKS[-1], peak)
+            # Temporaries included, above the memory in use before the call
+            allocated = peak - memory_before
+        stats = _STATS.setdefault(name, {'calls': 0, 'time': 0.0, 'bytes': 0})
+        stats['calls'] += 1
+        stats['time'] += elapsed
+        stats['bytes'] += allocated or 0
+        if _HOOK is not None:
+            _HOOK(name, elapsed, allocated)
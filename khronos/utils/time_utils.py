@@ -1,5 +1,10 @@
 import datetime
+import numpy
+from .instrumentation import instrumented
 
+DATE_FORMATS = ("%Y-%m-%d","%Y/%m/%d","%d-%m-%Y","%d/%m/%Y")
+
+@instrumented('coerce_date')
 def coerce_date(d):
     """Try to convert `d` to a datetime objects. The available formats are:
         - "dd-mm-yyyy"
@@ -8,16 +13,51 @@ def coerce_date(d):
         - "yyy-mm-dd"
     Raise an error if the parsing fails.
     """
-    parsed_date = None
-    formats = ("%Y-%m-%d","%Y/%m/%d","%d-%m-%Y","%d/%m/%Y")
-    for f in formats:
+    for f in DATE_FORMATS:
         try:
-            parsed_date = datetime.datetime.strptime(d,f)
-        except:
+            return datetime.datetime.strptime(d,f)
+        except (ValueError, TypeError): # TypeError for non string input
             pass
-    if parsed_date is None:
-        raise ValueError("Failed to parse date: {}".format(d))
-    return parsed_date
+    raise ValueError("Failed to parse date: {}".format(d))
+
+def infer_date_format(sample):
+    """Return the first format of DATE_FORMATS that can parse all the dates of `sample`
+    (a list or array of strings). Raise an error if there is none."""
+    for f in DATE_FORMATS:
+        try:
+            for d in sample:
+                datetime.datetime.strptime(d, f)
+        except (ValueError, TypeError):
+            continue
+        return f
+    raise ValueError("Failed to infer the format of the dates: {}".format(list(sample[:3])))
+
+@instrumented('parse_dates')
+def parse_dates(dates, date_format=None):
+    """Parse an array of date strings at once, into a numpy datetime64[us] array.
+    The format is inferred from the first dates if not given (see infer_date_format).
+    Zero-padded dates of the formats of DATE_FORMATS are parsed without any Python loop,
+    other dates with one `strptime` call (with the right format) per date.
+    """
+    dates = numpy.asarray(dates)
+    if len(dates) == 0:
+        return numpy.array([], dtype='datetime64[us]')
+    if date_format is None:
+        date_format = infer_date_format(dates[:100])
+    if date_format in DATE_FORMATS and numpy.all(numpy.char.str_len(dates) == 10):
+        # Reorder the characters to the ISO format (yyyy-mm-dd), that numpy parses natively
+        chars = numpy.ascontiguousarray(dates.astype('S10')).view(numpy.uint8).reshape(-1, 10)
+        year_first = date_format[1] == 'Y'
+        separators = chars[:, [4, 7] if year_first else [2, 5]]
+        if numpy.any(separators != ord(date_format[2])):
+            raise ValueError("Failed to parse the dates with format {}".format(date_format))
+        iso = numpy.full((len(dates), 10), ord('-'), dtype=numpy.uint8)
+        iso[:, [0,1,2,3,5,6,8,9]] = chars[:, [0,1,2,3,5,6,8,9] if year_first else [6,7,8,9,3,4,0,1]]
+        try:
+            return iso.view('S10').ravel().astype('datetime64[D]').astype('datetime64[us]')
+        except ValueError:
+            raise ValueError("Failed to parse the dates with format {}".format(date_format))
+    return numpy.array([datetime.datetime.strptime(d, date_format) for d in dates], dtype='datetime64[us]')
 
 def coerce_timedelta(d):
     """Try to convert `d` into a timedelta object. The available formats are:
@@ -37,7 +77,7 @@ def coerce_timedelta(d):
         raise ValueError("Failed to parse period: {}".format(d))
     
 def evenly_spaced_timeline(start_date, end_date, size):
-    """Return a list of `size` datetime objects evenly spaced between `start_date` and `end_date`."""
+    """Return a regular_timeline of `size` dates evenly spaced between `start_date` and `end_date`."""
     if not isinstance(start_date, datetime.datetime):
         start_date = coerce_date(start_date)
     if not isinstance(end_date, datetime.datetime):
@@ -45,24 +85,23 @@ def evenly_spaced_timeline(start_date, end_date, size):
     if end_date < start_date: 
         raise ValueError("end_date is before start_date")
     _delta = (end_date-start_date)/(size-1)
-    return([start_date + i*_delta for i in range(size)])
+    return regular_timeline(start_date, _delta, size)
 
 def fixed_period_timeline(ref_date, period, size):
-    """Return a list of `size` datetime objects evenly spaced by `period`.
+    """Return a regular_timeline of `size` dates evenly spaced by `period`.
     `period` should be a timedelta or a coercible string (1d, 1m, 1y).
-    If `period` is negative, the `ref_date` is considerated the last date of the list.
-    If `period` is positive, the `ref_date` is considerated the fist date of the list.
+    If `period` is negative, the `ref_date` is considerated the last date of the timeline.
+    If `period` is positive, the `ref_date` is considerated the fist date of the timeline.
     
     """
     if not isinstance(ref_date, datetime.datetime):
         ref_date = coerce_date(ref_date)
     if not isinstance(period, datetime.timedelta):
         period = coerce_timedelta(period)
-    lst_date = [ref_date + i*period for i in range(size)]
     if period < datetime.timedelta(days=0): #if ref date is the last date
-        return lst_date[::-1] #invert list
+        return regular_timeline(ref_date + (size-1)*period, -period, size)
     else:
-        return lst_date
+        return regular_timeline(ref_date, period, size)
     
 def delta_to_years(tdelta):
     """Approximate a timedelta object by a float representing the number of years"""
@@ -71,8 +110,9 @@ def delta_to_years(tdelta):
         (tdelta.seconds + tdelta.days * 24 * 3600) * 10 ** 6) / 10 ** 6
     return seconds/3600.0/24.0/365.25
 
+@instrumented('generate_timeline')
 def generate_timeline(N, start_date=None, end_date=None, by=None):
-    """Generate a datetime objects list (timeline) according to the arguments.
+    """Generate a regular_timeline according to the arguments.
     A first and last date of sampling can be given (with `start_date`
     and `end_date`), or a first or last date and a sampling periode (with `start_date` and `by`)
     
@@ -98,3 +138,120 @@ def generate_timeline(N, start_date=None, end_date=None, by=None):
     delta_t = delta_to_years(timeline[1] - timeline[0])
     return timeline, delta_t
 
+def as_timeline(timeline):
+    """Convert `timeline` (list, array or range of dates or numbers) to a compact timeline
+    object. Ranges become a regular_timeline, other sequences an irregular_timeline."""
+    if isinstance(timeline, _timeline):
+        return timeline
+    if isinstance(timeline, range):
+        return regular_timeline(timeline.start, timeline.step, len(timeline))
+    return irregular_timeline(timeline)
+
+def _object_dates(dates):
+    """Internal function, convert an object array of dates to datetime64 (in days if they
+    are all datetime.date, so they are boxed back as dates). Other objects are kept."""
+    if not all(isinstance(d, (datetime.date, numpy.datetime64)) for d in dates.flat):
+        return dates
+    if any(isinstance(d, (datetime.datetime, numpy.datetime64)) for d in dates.flat):
+        return dates.astype('datetime64[us]')
+    return dates.astype('datetime64[D]')
+
+class _timeline(object):
+    """Base class for the compact timelines. A timeline behaves as a read-only sequence
+    of dates (datetime objects) or numbers, but never stores dates as Python objects."""
+    def __len__(self):
+        return self.n
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+    
+    def __array__(self, dtype=None, copy=None):
+        values = self.to_array()
+        return values if dtype is None else values.astype(dtype)
+    
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, list(self) if len(self) < 7 else
+                               "{}, {}, ..., {}".format(self[0], self[1], self[-1]))
+    
+    def _index(self, i):
+        """Check a scalar index and return it as a positive integer"""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("timeline index out of range")
+        return int(i)
+    
+    @staticmethod
+    def _box(x):
+        """Convert a numpy scalar to the corresponding Python object (datetime or number)"""
+        return x.item() if isinstance(x, numpy.generic) else x
+
+class regular_timeline(_timeline):
+    """Timeline of `n` dates (or numbers) evenly spaced by `step`, starting at `start`.
+    Only the three parameters are stored, so the memory used does not depend on `n`.
+    
+    # Arguments:
+        start: datetime, numpy.datetime64 or number, the first date of the timeline.
+        step: timedelta, numpy.timedelta64 or number, the sampling periode.
+        n: int, the number of dates.
+    """
+    def __init__(self, start, step, n):
+        if isinstance(start, (datetime.datetime, numpy.datetime64)):
+            start, step = numpy.datetime64(start, 'us'), numpy.timedelta64(step, 'us')
+        self.start, self.step, self.n = start, step, int(n)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            r = range(self.n)[i]
+            return regular_timeline(self.start + r.start*self.step, r.step*self.step, len(r))
+        if numpy.ndim(i) > 0:
+            return irregular_timeline(self.start + numpy.arange(self.n)[i]*self.step)
+        return self._box(self.start + self._index(i)*self.step)
+    
+    def to_array(self):
+        """Return the dates as a numpy array (datetime64 for dated timelines)"""
+        return self.start + numpy.arange(self.n)*self.step
+    
+    def is_sorted(self):
+        """True if the dates are in increasing order"""
+        return self.step >= self.step*0 or self.n < 2
+    
+    @property
+    def nbytes(self):
+        return 0
+
+class irregular_timeline(_timeline):
+    """Timeline of arbitrary dates (or numbers), stored as a numpy array
+    (datetime64[us] for datetimes and datetime64[D] for dates, so 8 bytes per date).
+    Other objects (Decimal...) are kept in an object array. Slicing return views.
+    
+    # Arguments:
+        dates: list or array of datetimes, dates, numpy.datetime64 or numbers.
+    """
+    def __init__(self, dates):
+        if not isinstance(dates, numpy.ndarray):
+            dates = numpy.asarray(dates)
+        if dates.dtype == object:
+            dates = _object_dates(dates)
+        elif dates.dtype.kind == 'M' and numpy.datetime_data(dates.dtype)[0] != 'D':
+            dates = dates.astype('datetime64[us]', copy=False)
+        self.dates = dates
+        self.n = len(dates)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice) or numpy.ndim(i) > 0:
+            return irregular_timeline(self.dates[i])
+        return self._box(self.dates[self._index(i)])
+    
+    def to_array(self):
+        """Return the dates as a numpy array (datetime64 for dated timelines)"""
+        return self.dates
+    
+    def is_sorted(self):
+        """True if the dates are in increasing order"""
+        return bool(numpy.all(self.dates[1:] >= self.dates[:-1]))
+    
+    @property
+    def nbytes(self):
+        return self.dates.nbytes
@@ -1,35 +1,108 @@
-from matplotlib import pyplot as plt
+import numpy
 
-def plot_ts(series_1d_,style='classic'):
+def plot_ts(series_1d_, style='classic', max_points=2000, method='minmax'):
     """Plot a serie using pyplot. Will deal with train/test split if available
     #Argument:
-        style: string or list of strings, pyplot style(s) to use if needed"""
-
-    if not series_1d_._splitted:
-        with plt.style.context(style):
-            plt.plot(series_1d_.timeline, series_1d_.values, '-x')
+        style: string or list of strings, pyplot style(s) to use if needed
+        max_points: int, the maximum number of points plotted for each part of the
+            serie (None to plot every point). Longer series are decimated.
+        method: string, the decimation method: 'minmax' (the minimum and maximum of
+            each bucket of points, keeps the envelope) or 'lttb' (Largest Triangle
+            Three Buckets, keeps the visual shape)"""
+    if method not in ('minmax', 'lttb'):
+        raise ValueError("'method' should be 'minmax' or 'lttb', got {}".format(method))
+    plt = _pyplot()
+    x, y = _timeline_array(series_1d_.timeline), numpy.asarray(series_1d_.values)
+    N = len(y)
     
+    # Parts of the serie to plot, as index ranges (the validation and testing parts
+    # start at the last point of the previous part)
+    if not series_1d_._splitted:
+        parts = [(0, N, None)]
     else:
-        try:
-            _ = series_1d_._last_val_index
-        except:
-            _ = False
-            
-        tmp_serie = series_1d_.get_train()
-        with plt.style.context(style):
-            plt.plot(tmp_serie.timeline, tmp_serie.values, '-x', label='Training points')
-            
-        tmp_serie = series_1d_.get_test(include_last=True)
-        with plt.style.context(style):
-            plt.plot(tmp_serie.timeline, tmp_serie.values, '-x', label='Testing points')
-        
-        if _:
-            tmp_serie = series_1d_.get_val(include_last=True)
-            with plt.style.context(style):
-                plt.plot(tmp_serie.timeline, tmp_serie.values, '-x', label='Validation points')
-                
+        indx_train = series_1d_._last_train_index
+        indx_val = getattr(series_1d_, '_last_val_index', None)
+        parts = [(0, indx_train, 'Training points')]
+        if indx_val:
+            parts.append((max(indx_val - 1, 0), N, 'Testing points'))
+            parts.append((max(indx_train - 1, 0), indx_val, 'Validation points'))
+        else:
+            parts.append((max(indx_train - 1, 0), N, 'Testing points'))
+    
     with plt.style.context(style):
+        for start, end, label in parts:
+            indices = decimate(x[start:end], y[start:end], max_points, method)
+            marker = '-x' if len(indices) == end - start else '-'
+            plt.plot(x[start:end][indices], y[start:end][indices], marker, label=label)
         if series_1d_.name is not None:
             plt.ylabel(series_1d_.name)
-        plt.legend()
+        if series_1d_._splitted:
+            plt.legend()
     plt.show()
+
+def decimate(x, y, max_points, method='minmax'):
+    """Return the (sorted) indices of at most `max_points` points representing the curve
+    (x, y) visually, with the 'minmax' or 'lttb' method (see plot_ts).
+    Return all the indices if there are less than `max_points` points."""
+    N = len(y)
+    if max_points is None or N <= max_points:
+        return numpy.arange(N)
+    if method == 'lttb':
+        return lttb(x, y, max_points)
+    return minmax_envelope(y, max_points)
+
+def minmax_envelope(y, max_points):
+    """Indices of the minimum and maximum of each of `max_points // 2` buckets of
+    consecutive points, plus the first and last points (vectorized)"""
+    y = numpy.asarray(y, dtype=float)
+    N = len(y)
+    n_buckets = max(max_points // 2 - 1, 1)
+    size = -(-N // n_buckets)
+    padded = numpy.full(n_buckets * size, y[-1])
+    padded[:N] = y
+    buckets = padded.reshape(n_buckets, size)
+    offsets = numpy.arange(n_buckets) * size
+    indices = numpy.concatenate(([0, N - 1], offsets + buckets.argmin(axis=1), offsets + buckets.argmax(axis=1)))
+    return numpy.unique(numpy.minimum(indices, N - 1))
+
+def lttb(x, y, n_out):
+    """Indices of `n_out` points selected by the Largest Triangle Three Buckets algorithm:
+    in each bucket, the point making the largest triangle with the previously selected
+    point and the average of the next bucket."""
+    x, y = _as_float(x), numpy.asarray(y, dtype=float)
+    N = len(y)
+    if n_out >= N or n_out < 3:
+        return numpy.arange(N)
+    edges = numpy.linspace(1, N - 1, n_out - 1).astype(int)
+    selected = numpy.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, N - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else N
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = numpy.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(numpy.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def _pyplot():
+    """Internal function, import pyplot on first use (matplotlib is an optional dependency)"""
+    try:
+        from matplotlib import pyplot as plt
+    except ImportError:
+        raise ImportError("Plotting requires matplotlib, install it with `pip install khronos[plot]`")
+    return plt
+
+def _timeline_array(timeline):
+    """Internal function, the timeline as an array that pyplot can use"""
+    if hasattr(timeline, 'to_array'):
+        return timeline.to_array()
+    return numpy.asarray(timeline)
+
+def _as_float(x):
+    """Internal function, dates (datetime64) or numbers as floats"""
+    x = numpy.asarray(x)
+    if x.dtype.kind == 'M':
+        x = x.astype('datetime64[us]').astype('int64')
+    return x.astype(float)
@@ -8,18 +8,22 @@ setup(name='Khronos',
       url='https://github.com/PForet/khronos',
       packages = find_packages(exclude=['*.tests*']),
       license='MIT',
-      install_requires=['numpy',
+      python_requires='>=3.9',
+      install_requires=['numpy>=1.20',
 			'datetime'],
+      extras_require={'plot': ['matplotlib']},
       classifiers=[
           'Development Status :: 1 - Planning',
           'Intended Audience :: Developers',
           'Intended Audience :: Education',
           'Intended Audience :: Science/Research',
           'License :: OSI Approved :: MIT License',
-          'Programming Language :: Python :: 2',
-          'Programming Language :: Python :: 2.7',
           'Programming Language :: Python :: 3',
-          'Programming Language :: Python :: 3.6',
+          'Programming Language :: Python :: 3 :: Only',
+          'Programming Language :: Python :: 3.9',
+          'Programming Language :: Python :: 3.10',
+          'Programming Language :: Python :: 3.11',
+          'Programming Language :: Python :: 3.12',
           'Topic :: Software Development :: Libraries',
           'Topic :: Software Development :: Libraries :: Python Modules'
       ])
\ No newline at end of file
@@ -0,0 +1,43 @@
+import pytest
+import numpy
+from khronos.models import ARMA_model, fit_many
+from khronos.models.arma import residuals
+from khronos.series import generator
+
+def test_yule_walker():
+    s = generator.ARMA_generator(20000, p=[0.5,-0.2], q=[0])
+    model = ARMA_model(2, method='yule_walker').fit(s)
+    assert numpy.allclose(model.p, [0.5,-0.2], atol=0.05)
+    assert abs(model.sigma2 - 1) < 0.1
+    with pytest.raises(ValueError):
+        ARMA_model(2, 1, method='yule_walker')
+
+def test_css():
+    noise = numpy.random.normal(size=(20, 5000))
+    batch = generator.ARMA_generator(5000, p=[0.5,-0.2], q=[0.4], noise=noise, n_paths=20)
+    model = ARMA_model(2, 1).fit(batch.values)
+    assert model.p.shape == (20, 2) and model.q.shape == (20, 1) and model.sigma2.shape == (20,)
+    assert numpy.allclose(model.p.mean(axis=0), [0.5,-0.2], atol=0.05)
+    assert numpy.allclose(model.q.mean(axis=0), [0.4], atol=0.05)
+    # The residuals of the true model are the noise (once the initial conditions are forgotten)
+    e = residuals(batch.values, numpy.tile([0.5,-0.2], (20, 1)), numpy.tile([0.4], (20, 1)))
+    assert numpy.allclose(e[:, 100:], noise[:, 100:])
+    # A batch fit is the same as fitting each serie
+    single = ARMA_model(2, 1).fit(batch[7])
+    assert numpy.allclose(single.p, model.p[7]) and numpy.allclose(single.q, model.q[7])
+    # A pure AR model is a single regression
+    ar = ARMA_model(1).fit(generator.ARMA_generator(5000, p=[0.7], q=[0]))
+    assert abs(ar.p[0] - 0.7) < 0.05 and ar.q.shape == (0,)
+    assert len(ar.simulate(100).values) == 100
+    # Same noise level with a dated timeline
+    dated = ar.simulate(5000, seed=1, start_date="01/01/2000", by="1d")
+    assert abs(dated.values.std() / ar.simulate(5000, seed=1).values.std() - 1) < 1e-6
+    with pytest.raises(ValueError):
+        ARMA_model(2, 1).fit(numpy.zeros(5))
+
+def test_fit_many():
+    series = [generator.ARMA_generator(size, p=[0.6], q=[0.3]) for size in (2000, 3000, 2500)]
+    models = fit_many(series, 1, 1, processes=2)
+    assert len(models) == 3
+    for s, m in zip(series, models):
+        assert numpy.allclose(m.p, ARMA_model(1, 1).fit(s).p)
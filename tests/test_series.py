@@ -1,8 +1,10 @@
 import pytest
 import datetime
 import numpy 
-from khronos.series import series_1d
+from khronos.series import series_1d, series_panel, series_stream, open_series, save_chunks, read_csv, read_csv_chunks
+from khronos.series import resample, align
 from khronos.series import generator
+from khronos.series.filters import arma_filter
   
 def test_series_1d():
     # Test several ways of defining a serie
@@ -28,6 +30,19 @@ def test_series_1d():
     with pytest.raises(ValueError):
         #Should fail as a start_date alone is not sufficient
         s = series_1d([1,2,3], start_date='01/01/2012')
+    # Sorted timelines are not copied nor reordered, unsorted ones are sorted with ties ordered by value
+    values = numpy.arange(5.)
+    s = series_1d(values, timeline=numpy.arange(5)*2)
+    assert s.values is values
+    s = series_1d([3,1,2,0], timeline=[datetime.datetime(2001,1,1), datetime.datetime(2000,1,1),
+                                       datetime.datetime(2000,1,1), datetime.datetime(1999,1,1)])
+    assert list(s.values) == [0,1,2,3]
+    assert list(s.timeline) == sorted(s.timeline)
+    # Dated series keep a compact timeline, also when splitted
+    s = series_1d(list(range(10)), start_date='01/01/2000', by='1d')
+    s.train_test_split()
+    assert s.get_train().timeline.nbytes == 0
+    assert list(s.get_test().timeline) == list(s.timeline)[8:]
 
 def test_split_1d():
     split_80 = series_1d(list(range(10)))
@@ -63,6 +78,164 @@ def test_split_1d():
         s = series_1d(list(range(10)))
         s.train_test_split(train=0.3,val=0.8)
         
+def test_array_protocol():
+    s = series_1d(numpy.arange(1., 6.), start_date='01/01/2000', by='1d', name='s')
+    doubled = s * 2
+    assert isinstance(doubled, series_1d) and list(doubled.values) == [2, 4, 6, 8, 10]
+    assert doubled.timeline is s.timeline and doubled.name == 's'
+    assert list((s + s).values) == list((2 * s).values)
+    assert list(numpy.log(s).values) == list(numpy.log(s.values))
+    assert list((-s).values) == [-1, -2, -3, -4, -5] and list((s > 2).values) == [False, False, True, True, True]
+    assert numpy.sum(s) == 15 and numpy.add.reduce(s) == 15 and numpy.mean(s) == 3
+    assert numpy.asarray(s) is s.values and len(s) == 5
+    # Same dates in a different timeline object
+    other = series_1d(numpy.ones(5), timeline=list(s.timeline))
+    assert list((s - other).values) == [0, 1, 2, 3, 4]
+    # In place operations modify the buffer
+    values = s.values
+    s += 1
+    assert s.values is values and list(values) == [2, 3, 4, 5, 6]
+    numpy.multiply(s, other, out=s)
+    assert s.values is values
+    with pytest.raises(ValueError):
+        s + series_1d(numpy.ones(5))
+    # Element-wise comparisons have no truth value, and series are not hashable
+    with pytest.raises(ValueError):
+        bool(series_1d(numpy.arange(3)) == series_1d(numpy.arange(3) + 10))
+    with pytest.raises(TypeError):
+        hash(s)
+    
+def test_walk_forward_split():
+    s = series_1d(numpy.arange(10.))
+    folds = list(s.walk_forward_split(train_size=4, test_size=2))
+    assert [list(train.values) for train, _ in folds] == [list(range(0,4)), list(range(0,6)), list(range(0,8))]
+    assert [list(test.values) for _, test in folds] == [[4,5], [6,7], [8,9]]
+    folds = list(s.walk_forward_split(train_size=0.3, test_size=1, step=3, window='sliding'))
+    assert [list(train.values) for train, _ in folds] == [[0,1,2], [3,4,5], [6,7,8]]
+    assert [list(test.timeline) for _, test in folds] == [[3], [6], [9]]
+    # The folds are views of the serie
+    train, test = next(s.walk_forward_split(train_size=4, test_size=2))
+    assert train.values.base is s.values and test.values.base is s.values
+    # Bad arguments raise at the call, not at the first fold
+    with pytest.raises(ValueError):
+        s.walk_forward_split(train_size=8, test_size=3)
+    with pytest.raises(ValueError):
+        s.walk_forward_split(train_size=4, test_size=2, window='growing')
+    with pytest.raises(ValueError):
+        s.walk_forward_split(train_size=1.5, test_size=2)
+        
+def test_storage(tmpdir):
+    dated = series_1d(numpy.arange(100.), start_date='01/01/2000', by='1d', name='dated')
+    irregular = series_1d(numpy.arange(5, dtype='float32'), timeline=[datetime.datetime(2000+i**2, 1, 1) for i in range(5)])
+    numeric = series_1d(numpy.arange(10))
+    for s in (dated, irregular, numeric):
+        path = str(tmpdir.join('serie.khr'))
+        s.save(path)
+        opened = open_series(path)
+        assert isinstance(opened.values, numpy.memmap) and opened.values.dtype == s.values.dtype
+        assert list(opened.values) == list(s.values) and list(opened.timeline) == list(s.timeline)
+        assert opened.name == s.name
+        opened.train_test_split()
+        assert list(opened.get_test().values) == list(s.values[int(round(0.8*s.N)):])
+        assert isinstance(opened.get_test().values, numpy.memmap)
+        with pytest.raises(ValueError):
+            open_series(path, mode='w+') # Would overwrite the file
+        assert list(open_series(path).values) == list(s.values)
+    from decimal import Decimal
+    with pytest.raises(ValueError):
+        series_1d([1., 2.], timeline=[Decimal(1), Decimal(2)]).save(str(tmpdir.join('decimal')))
+    assert not tmpdir.join('decimal').check() # No file is written
+    with pytest.raises(ValueError):
+        tmpdir.join('other').write('not a serie')
+        open_series(str(tmpdir.join('other')))
+        
+def test_series_stream():
+    stream = series_stream(capacity=2)
+    for i in range(10):
+        stream.append(i)
+    stream.extend([10, 11], dates=[10.5, 12])
+    assert len(stream) == 12 and list(stream.values) == list(range(12))
+    assert list(stream.window(3).timeline) == [9, 10.5, 12]
+    # A rejected append leaves the stream unchanged
+    with pytest.raises(ValueError):
+        stream.extend([0, 1], dates=[13, 12])
+    assert len(stream) == 12 and stream.n_seen == 12
+    stream = series_stream()
+    with pytest.raises(ValueError):
+        stream.extend([0, 1], dates=[1, 0])
+    for date in ('2000-01-01', object()):
+        with pytest.raises(ValueError):
+            stream.append(0, date)
+    stream.append(0)
+    stream.append(1)
+    assert list(stream.timeline) == [0, 1] and stream.n_seen == 2
+    
+    ring = series_stream(max_length=4)
+    day = datetime.timedelta(days=1)
+    for i in range(11):
+        ring.append(i, datetime.datetime(2000, 1, 1) + i*day)
+        window = ring.window()
+        assert list(window.values) == list(range(max(0, i-3), i+1))
+        assert window.values.base is ring._values # No copy
+    assert list(ring.window(2).timeline) == [datetime.datetime(2000, 1, 10), datetime.datetime(2000, 1, 11)]
+    ring.extend(numpy.arange(20, 30), dates=[datetime.datetime(2001, 1, i) for i in range(1, 11)])
+    assert list(ring.values) == [26, 27, 28, 29] and ring.n_seen == 21
+    with pytest.raises(ValueError):
+        ring.append(0, datetime.datetime(2000, 1, 1)) # Dates must be increasing
+    with pytest.raises(ValueError):
+        ring.window(5)
+    with pytest.raises(ValueError):
+        ring.append(0, 100) # Can't mix dated and numeric dates
+        
+def test_read_csv(tmpdir):
+    path = tmpdir.join('serie.csv')
+    path.write("date,price,volume\n03/01/2000,1.5,10\n01/01/2000,2.5,20\n\n02/01/2000, 3.5,30\n")
+    s = read_csv(str(path), date_column='date', value_column='volume', header=True, chunk_size=2)
+    assert list(s.values) == [20, 30, 10] and s.name == 'volume'
+    assert list(s.timeline) == [datetime.datetime(2000, 1, d) for d in (1, 2, 3)]
+    chunks = list(read_csv_chunks(str(path), value_column=1, header=True, chunk_size=2))
+    assert [len(c.values) for c in chunks] == [2, 1]
+    path.write("1999-12-31;1\n2000-01-01;2\n")
+    s = read_csv(str(path), delimiter=';')
+    assert list(s.timeline) == [datetime.datetime(1999, 12, 31), datetime.datetime(2000, 1, 1)]
+    s = read_csv(str(path), date_column=None, delimiter=';')
+    assert list(s.values) == [1, 2] and list(s.timeline) == [0, 1]
+    path.write("12-31-1999,1\n01-01-2000,2\n")
+    with pytest.raises(ValueError):
+        read_csv(str(path)) # Not a known format
+    s = read_csv(str(path), date_format="%m-%d-%Y")
+    assert s.timeline[0] == datetime.datetime(1999, 12, 31)
+        
+def test_resample():
+    s = series_1d([1., 2, 3, 4, 5], timeline=[0, 0.5, 1.2, 3.1, 3.9])
+    assert numpy.allclose(resample(s, 1).values, [1.5, 3, numpy.nan, 4.5], equal_nan=True)
+    assert list(resample(s, 1, how='count').values) == [2, 1, 0, 2]
+    assert list(resample(s, 1, how='last', fill='ffill').values) == [2, 3, 3, 5]
+    assert list(resample(s, 1, how='first', fill='linear').values) == [1, 3, 3.5, 4]
+    assert list(resample(s, 1, how='max').timeline) == [0, 1, 2, 3]
+    assert numpy.allclose(resample(s, 0.5, how='interpolate').values[:3], [1, 2, 2 + 0.5/0.7])
+    day = datetime.timedelta(days=1)
+    dated = series_1d(numpy.arange(48.), timeline=[datetime.datetime(2000, 1, 1) + i*day/24 for i in range(48)])
+    daily = resample(dated, '1d', how='sum')
+    assert list(daily.values) == [sum(range(24)), sum(range(24, 48))]
+    assert list(daily.timeline) == [datetime.datetime(2000, 1, 1), datetime.datetime(2000, 1, 2)]
+    with pytest.raises(ValueError):
+        resample(s, 1, how='median')
+
+def test_align():
+    a = series_1d([1., 2, 3, 4], timeline=[1, 2, 4, 6])
+    b = series_1d([10., 20, 30], timeline=[2, 3, 6])
+    a1, b1 = align(a, b)
+    assert list(a1.timeline) == [2, 6] and list(a1.values) == [2, 4] and list(b1.values) == [10, 30]
+    a2, b2 = align(a, b, how='outer')
+    assert list(a2.timeline) == [1, 2, 3, 4, 6]
+    assert numpy.allclose(a2.values, [1, 2, numpy.nan, 3, 4], equal_nan=True)
+    assert numpy.allclose(b2.values, [numpy.nan, 10, 20, numpy.nan, 30], equal_nan=True)
+    a3, b3 = align(a, b, how='asof')
+    assert a3 is a and numpy.allclose(b3.values, [numpy.nan, 10, 20, 30], equal_nan=True)
+    with pytest.raises(ValueError):
+        align(a, series_1d([1, 2], start_date='01/01/2000', by='1d'))
+        
 def test_generator():
     g1 = generator.gaussian_noise(10,scale=1)
     g1b = generator.gaussian_noise(10, start_date="01/01/2000", by="1d")
@@ -79,6 +252,170 @@ def test_generator():
     ARMA4 = generator.ARMA_generator(6, p = [0], q=[0,1], noise=noise)
     assert list(ARMA4.values) == [0,0,1,0,1,0]
     
+def test_generator_paths():
+    g = generator.gaussian_noise(50, n_paths=20, start_date="01/01/2000", by="1d")
+    assert isinstance(g, series_panel)
+    assert g.values.shape == (20, 50) and len(g) == 20 and len(g.timeline) == 50
+    assert isinstance(g[3], series_1d) and list(g[3].values) == list(g.values[3])
+    l = generator.laplacian_noise(50, n_paths=5)
+    assert l.values.shape == (5, 50)
+    # Each path of a batch is the same as a single path with the same noise
+    noise = numpy.random.normal(size=(4, 30))
+    batch = generator.ARMA_generator(30, p=[0.4,0.1], q=[0.4], noise=noise, n_paths=4)
+    single = generator.ARMA_generator(30, p=[0.4,0.1], q=[0.4], noise=noise[2])
+    assert numpy.allclose(batch.values[2], single.values)
+    batch = generator.ARMA_generator(30, p=[0.4,0.1], q=[0.4], n_paths=4)
+    assert batch.values.shape == (4, 30)
+    with pytest.raises(ValueError):
+        # Should fail as the noise is not of shape (n_paths, size)
+        generator.ARMA_generator(30, p=[0.4], q=[0.4], noise=noise[0], n_paths=4)
+    with pytest.raises(ValueError):
+        series_panel(numpy.zeros(10))
+    panel = series_panel([[1,2,3],[4,5,6]], timeline=[3,1,2])
+    assert list(panel.values[1]) == [5,6,4] and list(panel.timeline) == [1,2,3]
+    
+def test_series_panel():
+    values = numpy.arange(30.).reshape(3, 10)
+    panel = series_panel(values, start_date='01/01/2000', by='1d', names=['a', 'b', 'c'])
+    assert panel['b'].name == 'b' and list(panel['b'].values) == list(range(10, 20))
+    assert numpy.shares_memory(panel[1].values, values)
+    sub = panel.select(['b', 'c'])
+    assert sub.names == ['b', 'c'] and numpy.shares_memory(sub.values, values)
+    assert list(panel.select([2, 0]).values[1]) == list(range(10))
+    assert len(panel.select(slice(0, 2))) == 2
+    # Negative indices, as for panel[-1]
+    assert panel.select([-1]).values.shape == (1, 10) and list(panel.select([-1]).values[0]) == list(panel[-1].values)
+    assert numpy.shares_memory(panel.select([-2, -1]).values, panel.values)
+    with pytest.raises(IndexError):
+        panel.select([len(panel)])
+    with pytest.raises(KeyError):
+        panel['d']
+    # Same split points as series_1d
+    panel.train_test_split(test=0.3, val=0.3)
+    reference = panel['a']
+    reference.train_test_split(test=0.3, val=0.3)
+    for get in ('get_train', 'get_val', 'get_test'):
+        part = getattr(panel, get)()
+        assert numpy.shares_memory(part.values, values)
+        assert list(part.values[0]) == list(getattr(reference, get)().values)
+        assert list(part.timeline) == list(getattr(reference, get)().timeline)
+    assert list(panel.get_test(include_last=True).values[2]) == list(range(26, 30))
+    # Conversion from and to series_1d
+    series = panel.to_series()
+    assert len(series) == 3 and series[2].name == 'c'
+    rebuilt = series_panel.from_series(series)
+    assert (rebuilt.values == values).all() and rebuilt.names == ['a', 'b', 'c']
+    with pytest.raises(ValueError):
+        series_panel.from_series([series[0], series_1d(numpy.arange(10.))])
+    
+def test_generator_seed():
+    g1 = generator.gaussian_noise(100, seed=42)
+    g2 = generator.gaussian_noise(100, seed=numpy.random.SeedSequence(42))
+    assert (g1.values == g2.values).all()
+    assert not (g1.values == generator.gaussian_noise(100, seed=43).values).all()
+    # A Generator is advanced by each call
+    rng = numpy.random.default_rng(42)
+    assert not (generator.gaussian_noise(5, seed=rng).values == generator.gaussian_noise(5, seed=rng).values).all()
+    rng1, rng2 = numpy.random.default_rng(42), numpy.random.default_rng(42)
+    assert (generator.gaussian_noise(5, seed=rng1).values == generator.gaussian_noise(5, seed=rng2).values).all()
+    # The first path of a batch is the single path with the same seed
+    batch = generator.laplacian_noise(100, n_paths=600, seed=42)
+    assert (batch.values[0] == generator.laplacian_noise(100, seed=42).values).all()
+    assert (batch.values[512:] == generator.laplacian_noise(100, n_paths=88, seed=42, path_offset=512).values).all()
+    with pytest.raises(ValueError):
+        generator.gaussian_noise(100, n_paths=10, seed=42, path_offset=10)
+    # Same paths whatever the number of processes
+    reference = generator.ARMA_generator(50, p=[0.5], q=[0.3], n_paths=600, seed=7)
+    for processes in (1, 2, 3):
+        parallel = generator.generate_parallel(generator.ARMA_generator, 50, 600, seed=7,
+                                               processes=processes, p=[0.5], q=[0.3])
+        assert parallel.values.shape == (600, 50) and (parallel.values == reference.values).all()
+    # Precision of the values
+    single = generator.ARMA_generator(1000, p=[0.5], q=[0.3], n_paths=3, seed=7, dtype=numpy.float32)
+    assert single.values.dtype == numpy.float32
+    assert (single.values == generator.ARMA_generator(1000, p=[0.5], q=[0.3], n_paths=3, seed=7, dtype=numpy.float32).values).all()
+    assert generator.laplacian_noise(10, seed=1, dtype=numpy.float32).values.dtype == numpy.float32
+    
+def test_generator_chunks(tmpdir):
+    reference = generator.ARMA_generator(10000, p=[0.4,0.1,-0.2], q=[0.4], seed=3, start_date="01/01/2000", by="1d")
+    chunks = list(generator.ARMA_chunks(10000, p=[0.4,0.1,-0.2], q=[0.4], chunk_size=999, seed=3,
+                                        start_date="01/01/2000", by="1d"))
+    assert [len(c) for c in chunks] == [999]*10 + [10]
+    # Same values as a one-shot generation, the state of the filter is carried between chunks
+    assert (numpy.concatenate([c.values for c in chunks]) == reference.values).all()
+    assert chunks[1].timeline[0] == reference.timeline[999]
+    noise = numpy.random.normal(size=1000)
+    assert (numpy.concatenate([c.values for c in generator.ARMA_chunks(1000, [0.5], [0.3], chunk_size=300, noise=noise)])
+            == generator.ARMA_generator(1000, [0.5], [0.3], noise=noise).values).all()
+    # A lag larger than the chunks and than the noise array
+    assert (numpy.concatenate([c.values for c in generator.ARMA_chunks(1000, {1500: 0.3}, [], chunk_size=300, noise=noise)])
+            == generator.ARMA_generator(1000, {1500: 0.3}, [], noise=noise).values).all()
+    # Written to disk chunk by chunk
+    path = str(tmpdir.join('arma'))
+    assert save_chunks(generator.ARMA_chunks(10000, p=[0.4,0.1,-0.2], q=[0.4], chunk_size=999, seed=3,
+                                             start_date="01/01/2000", by="1d"), path) == 10000
+    opened = open_series(path)
+    assert isinstance(opened.values, numpy.memmap) and (opened.values == reference.values).all()
+    assert list(opened.timeline[-3:]) == list(reference.timeline[-3:])
+    with pytest.raises(ValueError):
+        save_chunks([chunks[0], chunks[2]], path)
+    
+def test_generator_seasonal():
+    noise = numpy.random.normal(size=2000)
+    serie = generator.SARIMA_generator(2000, [0.5], [0.3], P=[0.4], Q=[0.2], season=300, noise=noise)
+    assert serie.name == "SARIMA (1,0,1)x(1,0,1)_300"
+    # Same as the ARMA model with the (sparse) product of the lag polynomials
+    dense = numpy.zeros(301)
+    dense[[0, 299, 300]] = [0.5, 0.4, -0.2]
+    reference = generator.ARMA_generator(2000, dense, {1: 0.3, 300: 0.2, 301: 0.06}, noise=noise)
+    assert numpy.allclose(serie.values, reference.values)
+    # Differencing integrates the serie
+    integrated = generator.SARIMA_generator(2000, {}, {}, d=1, noise=noise)
+    assert numpy.allclose(numpy.diff(integrated.values)[1:], noise[2:])
+    seasonal = generator.SARIMA_generator(2000, {}, {}, D=1, season=7, noise=noise)
+    assert numpy.allclose(seasonal.values[15:] - seasonal.values[8:-7], noise[15:])
+    # Chunks of a sparse model
+    chunks = generator.ARMA_chunks(5000, {1: 0.5, 300: 0.3}, {24: 0.2}, chunk_size=999, seed=3)
+    assert (numpy.concatenate([c.values for c in chunks])
+            == generator.ARMA_generator(5000, {1: 0.5, 300: 0.3}, {24: 0.2}, seed=3).values).all()
+    with pytest.raises(ValueError):
+        generator.SARIMA_generator(100, [0.5], [], P=[0.4])
+    # Lags larger than a noise array: the pre-sample repeats the end of the array
+    noise = numpy.random.normal(size=500)
+    serie = generator.ARMA_generator(500, {876: 0.3}, [], noise=noise, start_date="01/01/2000", by="1d")
+    assert len(serie) == 500 and len(serie.timeline) == 500
+    assert numpy.allclose(serie.values[1:], noise[1:] + 0.3*noise[(numpy.arange(1, 500) - 876) % 500])
+    assert len(generator.SARIMA_generator(500, [0.5], [], P=[0.3], season=876, noise=noise)) == 500
+    
+def test_arma_filter():
+    def loop_filter(noise, p, q, start):
+        # Reference step by step implementation
+        values = numpy.array(noise, dtype=float)
+        for t in range(start, len(noise)):
+            values[t] += sum(p[i]*values[t-1-i] for i in range(len(p)))
+            values[t] += sum(q[j]*noise[t-1-j] for j in range(len(q)))
+        return values
+    noise = numpy.random.normal(size=1000)
+    for p, q in (([0.5], [0.3]), ([0.4,0.1,-0.2], [0.4]), ([0.1]*5, [0.2,0,0.1]), ([0], [0.5,0.2])):
+        start = max(len(p), len(q)) + 1
+        for block_size in (1, 2, 7, 256):
+            assert numpy.allclose(arma_filter(noise, p, q, start=start, block_size=block_size),
+                                  loop_filter(noise, p, q, start))
+    # Paths are filtered independently along the last axis
+    batch = numpy.random.normal(size=(3, 100))
+    filtered = arma_filter(batch, [0.4,0.1], [0.4], start=3)
+    assert filtered.shape == (3, 100)
+    assert numpy.allclose(filtered[1], loop_filter(batch[1], [0.4,0.1], [0.4], 3))
+    with pytest.raises(ValueError):
+        arma_filter(noise, [0.4,0.1], [0.4], start=1)
+    # Sparse lags, larger than the blocks
+    p, q = {1: 0.3, 300: 0.4, 301: -0.12}, {2: 0.5, 300: 0.2}
+    dense_p, dense_q = numpy.zeros(301), numpy.zeros(300)
+    dense_p[[0, 299, 300]], dense_q[[1, 299]] = [0.3, 0.4, -0.12], [0.5, 0.2]
+    for block_size in (7, 256):
+        assert numpy.allclose(arma_filter(noise, p, q, start=301, block_size=block_size),
+                              loop_filter(noise, dense_p, dense_q, 301))
+    
         
 if __name__ == '__main__':
     pytest.main([__file__])
@@ -0,0 +1,109 @@
+import pytest
+import numpy
+from khronos import stats
+from khronos.series import series_1d, series_stream, generator
+
+def naive_rolling(x, window, f):
+    # Reference implementation, recomputing each window
+    out = numpy.full(len(x), numpy.nan)
+    for t in range(window-1, len(x)):
+        out[t] = f(x[t-window+1:t+1])
+    return out
+
+def naive_autocov(w, lag):
+    m = w.mean()
+    return numpy.sum((w[lag:] - m)*(w[:len(w)-lag] - m)) / len(w)
+
+def test_rolling(monkeypatch):
+    x = numpy.random.normal(size=500) + 1e6 # Large offset to test the numerical stability
+    for window in (1, 2, 17, 500):
+        assert numpy.allclose(stats.rolling_mean(x, window), naive_rolling(x, window, numpy.mean), equal_nan=True)
+        assert numpy.allclose(stats.rolling_var(x, window), naive_rolling(x, window, numpy.var), equal_nan=True)
+        assert numpy.allclose(stats.rolling_min(x, window), naive_rolling(x, window, numpy.min), equal_nan=True)
+        assert numpy.allclose(stats.rolling_max(x, window), naive_rolling(x, window, numpy.max), equal_nan=True)
+    for lag in (0, 1, 5):
+        assert numpy.allclose(stats.rolling_autocov(x, 20, lag=lag),
+                              naive_rolling(x, 20, lambda w: naive_autocov(w, lag)), equal_nan=True)
+    # Same results when the serie is computed in several chunks
+    monkeypatch.setattr(stats.rolling, '_CHUNK', 7)
+    assert numpy.allclose(stats.rolling_var(x, 2), naive_rolling(x, 2, numpy.var), equal_nan=True)
+    assert numpy.allclose(stats.rolling_autocov(x, 3, lag=1),
+                          naive_rolling(x, 3, lambda w: naive_autocov(w, 1)), equal_nan=True)
+    monkeypatch.undo()
+    # Random walk with a trend: the level drifts within any long chunk
+    walk = numpy.cumsum(numpy.random.normal(size=10**5)) + 0.5*numpy.arange(10**5)
+    windows = numpy.lib.stride_tricks.sliding_window_view(walk, 5)
+    reference = windows.var(axis=-1, ddof=1)
+    assert numpy.max(numpy.abs(stats.rolling_var(walk, 5, ddof=1)[4:] - reference) / reference) < 1e-8
+    centered = windows - windows.mean(axis=-1, keepdims=True)
+    reference = (centered[:, 1:] * centered[:, :-1]).sum(axis=-1) / 5
+    assert numpy.max(numpy.abs(stats.rolling_autocov(walk, 5, lag=1)[4:] - reference) / windows.var(axis=-1)) < 1e-8
+    # Series and 2D arrays are accepted
+    s = series_1d(x[:100])
+    assert numpy.allclose(stats.rolling_mean(s, 5), stats.rolling_mean(x[:100], 5), equal_nan=True)
+    batch = numpy.random.normal(size=(3, 100))
+    assert numpy.allclose(stats.rolling_var(batch, 10, ddof=1)[1], stats.rolling_var(batch[1], 10, ddof=1), equal_nan=True)
+    assert numpy.allclose(stats.rolling_max(batch, 10)[2], stats.rolling_max(batch[2], 10), equal_nan=True)
+    
+    y = stats.ewma([1., 0, 0, 2], alpha=0.5)
+    assert list(y) == [1, 0.5, 0.25, 1.125]
+    with pytest.raises(ValueError):
+        stats.rolling_mean(x, 501)
+    with pytest.raises(ValueError):
+        stats.ewma(x, alpha=0)
+
+def test_online():
+    x = numpy.random.normal(size=300) + 1e6
+    moments = stats.running_moments()
+    for v in x[:100]:
+        moments.update(v)
+    moments.feed(series_1d(x[100:]))
+    assert moments.n == 300 and numpy.isclose(moments.mean, x.mean())
+    assert numpy.isclose(moments.variance(ddof=1), x.var(ddof=1)) and moments.max == x.max()
+    
+    rolling = stats.rolling_moments(20)
+    stream = series_stream()
+    for v in x:
+        rolling.update(v)
+        stream.append(v)
+    assert numpy.isclose(rolling.mean, x[-20:].mean()) and numpy.isclose(rolling.variance(), x[-20:].var())
+    assert rolling.min == x[-20:].min() and rolling.max == x[-20:].max()
+    
+    smooth = stats.running_ewma(0.1)
+    smooth.update(x[0])
+    smooth.feed(x[1:])
+    assert numpy.isclose(smooth.value, stats.ewma(x, 0.1)[-1])
+    
+    acov = stats.running_autocov(lag=3)
+    acov.feed(stream)
+    assert numpy.isclose(acov.value, naive_autocov(x, 3))
+
+def test_correlation():
+    x = numpy.random.normal(size=300)
+    xc = x - x.mean()
+    direct = numpy.array([numpy.sum(xc[k:]*xc[:len(x)-k]) for k in range(11)]) / len(x)
+    assert numpy.allclose(stats.acovf(x, 10), direct)
+    assert numpy.allclose(stats.acf(x, 10), direct / direct[0])
+    assert stats.acf(x).shape == (300,)
+    # PACF: last coefficient of the Yule-Walker solution of each order
+    partial = stats.pacf(x, 5)
+    for k in range(1, 6):
+        R = numpy.array([[direct[abs(i-j)] for j in range(k)] for i in range(k)])
+        assert numpy.isclose(partial[k], numpy.linalg.solve(R, direct[1:k+1])[-1])
+    # An AR(1) has a PACF cutting off after lag 1
+    ar = generator.ARMA_generator(20000, p=[0.7], q=[0])
+    partial = stats.pacf(ar, 3)
+    assert abs(partial[1] - 0.7) < 0.05 and all(abs(partial[2:]) < 0.05)
+    # Batches are computed row by row
+    batch = numpy.random.normal(size=(4, 100))
+    assert numpy.allclose(stats.pacf(batch, 5)[2], stats.pacf(batch[2], 5))
+    
+    y = numpy.random.normal(size=300)
+    yc = y - y.mean()
+    cross = numpy.array([numpy.sum(xc[k:]*yc[:len(y)-k]) for k in range(6)]) / len(x) / (x.std()*y.std())
+    assert numpy.allclose(stats.ccf(x, y, 5), cross)
+    assert numpy.allclose(stats.ccf(x, x, 5), stats.acf(x, 5))
+    with pytest.raises(ValueError):
+        stats.acf(x, 300)
+    with pytest.raises(ValueError):
+        stats.ccf(x, y[:10])
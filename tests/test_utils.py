@@ -1,5 +1,11 @@
+import datetime
+import numpy
+import os
+import subprocess
+import sys
 import pytest
 from khronos.utils import time_utils as tu
+from khronos.utils import visual
 
 def test_generate_timeline():
     #Three methods of generation with the same delta time
@@ -30,4 +36,100 @@ def test_delta_to_years():
     
     assert abs(tu.delta_to_years(tu.coerce_timedelta("1d"))*365.25 - tu.delta_to_years(tu.coerce_timedelta("1y"))) < 10e-4
     
-    
\ No newline at end of file
+    
+def test_compact_timeline():
+    tl, _ = tu.generate_timeline(1000, start_date="01/01/2000", by="1d")
+    assert isinstance(tl, tu.regular_timeline) and len(tl) == 1000 and tl.nbytes == 0
+    assert tl[0] == datetime.datetime(2000, 1, 1)
+    assert tl[-1] == datetime.datetime(2000, 1, 1) + 999*datetime.timedelta(days=1)
+    sub = tl[10:20:2]
+    assert isinstance(sub, tu.regular_timeline) and len(sub) == 5
+    assert list(sub) == [tl[i] for i in range(10, 20, 2)]
+    assert list(tl[::-1][:3]) == [tl[999], tl[998], tl[997]]
+    with pytest.raises(IndexError):
+        tl[1000]
+    # A negative period gives the same timeline, ending at the reference date
+    tl_end, _ = tu.generate_timeline(1000, end_date=tl[-1], by="1d")
+    assert list(tl_end) == list(tl)
+    assert tl.is_sorted() and not tl[::-1].is_sorted()
+    
+    dates = [datetime.datetime(2000, 1, 1), datetime.datetime(2000, 3, 1), datetime.datetime(2001, 1, 1)]
+    itl = tu.irregular_timeline(dates)
+    assert itl.nbytes == 8*3 and list(itl) == dates and itl.is_sorted()
+    assert itl[1:].dates.base is not None # Slices are views
+    assert list(tl[[0, 2]]) == [tl[0], tl[2]]
+    assert (numpy.asarray(tl[:3]) == numpy.asarray(tl)[:3]).all()
+    # Dates stay dates, other objects are kept as they are
+    days = [datetime.date(2000, 1, 2), datetime.date(2000, 1, 1)]
+    assert list(tu.irregular_timeline(days)[::-1]) == days[::-1]
+    from decimal import Decimal
+    from khronos.series import series_1d
+    s = series_1d([1., 2.], timeline=[Decimal(2), Decimal(1)])
+    assert list(s.values) == [2, 1] and list(s.timeline) == [Decimal(1), Decimal(2)]
+    
+    numeric = tu.regular_timeline(0.5, 0.25, 4)
+    assert list(numeric) == [0.5, 0.75, 1.0, 1.25]
+
+def test_parse_dates():
+    assert tu.coerce_date("31/12/1999") == datetime.datetime(1999, 12, 31)
+    assert tu.infer_date_format(["31/12/1999", "01/01/2000"]) == "%d/%m/%Y"
+    expected = numpy.array(['1999-12-31', '2000-01-01'], dtype='datetime64[us]')
+    for dates in (["31/12/1999", "01/01/2000"], ["1999/12/31", "2000/01/01"], ["31-12-1999", "1-1-2000"]):
+        assert (tu.parse_dates(dates) == expected).all()
+    with pytest.raises(ValueError):
+        tu.parse_dates(["1999-12-31", "2000/01/01"], "%Y-%m-%d")
+    with pytest.raises(ValueError):
+        tu.parse_dates(["1999-02-31"])
+    with pytest.raises(ValueError):
+        tu.coerce_date(datetime.date(2000, 1, 1)) # Not a string
+
+def test_decimation():
+    x = numpy.arange(100000)
+    y = numpy.sin(x / 1000.) + numpy.random.normal(scale=0.1, size=len(x))
+    for method in ('minmax', 'lttb'):
+        indices = visual.decimate(x, y, 500, method)
+        assert len(indices) <= 500 and indices[0] == 0 and indices[-1] == len(x) - 1
+        assert (numpy.diff(indices) > 0).all()
+    # The envelope keeps the extrema
+    indices = visual.minmax_envelope(y, 500)
+    assert y.argmax() in indices and y.argmin() in indices
+    assert len(visual.decimate(x[:100], y[:100], 500)) == 100
+    dates = numpy.datetime64('2000-01-01') + numpy.arange(1000)
+    assert len(visual.lttb(dates, y[:1000], 50)) == 50
+
+def test_lazy_imports():
+    # Plotting dependencies are only imported on first use
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    statement = ("import sys, khronos.series, khronos.stats, khronos.models, khronos.utils.visual;"
+                 "print('matplotlib' in sys.modules)")
+    assert subprocess.check_output([sys.executable, '-c', statement], cwd=root).strip() == b'False'
+
+def test_instrumentation():
+    from khronos.utils import instrumentation
+    from khronos.series.generator import ARMA_generator
+    from khronos.series import series_1d
+    calls = []
+    with instrumentation.profile(memory=True, hook=lambda *args: calls.append(args)) as stats:
+        ARMA_generator(1000, p=[0.5], q=[0.3], start_date="01/01/2000", by="1d")
+        series_1d(numpy.arange(3.), timeline=numpy.array([2, 0, 1]))
+    for name in ('generate_timeline', 'noise', 'arma_filter', 'ARMA_generator', 'series_1d.sort'):
+        assert stats[name]['calls'] >= 1 and stats[name]['time'] >= 0
+    assert stats['arma_filter']['bytes'] >= 8 * 1000
+    assert len(calls) == sum(s['calls'] for s in stats.values())
+    assert not instrumentation.is_enabled()
+    # Nothing is recorded once disabled
+    before = instrumentation.get_stats()
+    ARMA_generator(100, p=[0.5], q=[0.3])
+    assert instrumentation.get_stats() == before
+    # Peak memory: temporaries are counted, in the enclosing calls too
+    @instrumentation.instrumented('inner')
+    def inner():
+        return len(numpy.ones(10**6))
+    @instrumentation.instrumented('outer')
+    def outer():
+        numpy.ones(2 * 10**6).sum()
+        return inner()
+    with instrumentation.profile(memory=True) as stats:
+        outer()
+    assert 8 * 10**6 <= stats['inner']['bytes'] < 16 * 10**6
+    assert stats['outer']['bytes'] >= 16 * 10**6